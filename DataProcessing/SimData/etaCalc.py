@@ -1,17 +1,11 @@
-import numpy as np
+from DataProcessing import eta_kernel as ek
 
 def calc_eta(x1, u1):
-    """Recursively calculates eta based on x1 and u1"""
-    n = len(x1)
-    eta = np.zeros(n)
-    for i in range(1, n):
-        eta[i] = u1[i-1] - x1[i]
-    eta[0] = eta[1]
-    return eta
+    """Calculates eta = u1[k-1] - x1[k] on a contiguous segment, eta is not clamped for the simulation data
+    A single sample gives eta = 0
+    """
+    return ek.calc_eta_segments(x1, u1, [0, len(x1)], clamp=False)
 
 def calc_eta_TD(x1, u1, tskips):
-    n = len(x1)
-    eta = np.zeros(n)
-    for i in range(len(tskips)-1):
-        eta[tskips[i]:tskips[i+1]] = calc_eta(x1[tskips[i]:tskips[i+1]], u1[tskips[i]:tskips[i+1]])
-    return eta
+    """Calculates eta of all the segments in one pass, tskips is a SegmentIndex or the t_skips offsets"""
+    return ek.calc_eta_segments(x1, u1, tskips, clamp=False)
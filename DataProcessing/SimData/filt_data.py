@@ -1,7 +1,11 @@
 import numpy as np
+from DataProcessing import segments as sg
+from DataProcessing import batch_filtering as bf
 from DataProcessing.SimData import rdRawDat as rd
 from DataProcessing.SimData import sosFiltering as sf
-from DataProcessing.SimData import etaCalc
+from DataProcessing import row_cleaning as rc
+from DataProcessing import derived_channels as dch
+from DataProcessing import parallel_load as pl
 
 # Array Manipulating functions ------------------------------------------------------
 #==============================================================================================
@@ -9,68 +13,40 @@ def find_discontinuities(t, dt):
     """Find the discontinuities in the time Data
     The slices would be: [ [t_skips[0], t_skips[1]], ... [t_skips[n-1], t_skips[n]] ]
     """
-    t_skips = np.array([i for i in range(1, len(t))
-                        if t[i] - t[i - 1] > 1.5 * dt], dtype=int)
-    t_skips = np.append(t_skips, len(t))            # Included the len(t) to follow the slicing rule of open interval
-    t_skips = np.insert(t_skips, 0, 0)
-    return t_skips
+    # The offsets include 0 and len(t) to follow the slicing rule of open interval
+    return sg.find_segments(t, 1.5 * dt).offsets
 
 
-# =============================================================================================
-def rmNaNrows(x):
-    """Remove the rows with NaN values"""
-    return np.delete(x,
-                     [i for i in range(len(x))
-                         if np.any(np.isnan(x[i]))],
-                     axis=0)
-
 
 #===============================================================================================
 class FilteredSimData():
     """Class of filtered test data both ssd and iod"""
     #===========================================================================================
-    def __init__(self, sim_type: int):
+    def __init__(self, sim_type: int, filt_workers: int | None = 1):
         self.rawData = rd.RawSimData(sim_type)
         self.dt = self.rawData.dt
         self.name = self.rawData.name
+        self.filt_workers = filt_workers     # Threads filtering the segments, None for all cores
         self.ssd = self.gen_ssd()
 
     # ==========================================================================================
     def gen_ssd(self) -> dict[str, np.ndarray]:
         # Generate the state space Data
-        raw_tab = np.matrix([self.rawData.raw['t'],
-                             self.rawData.raw['x1'],
-                             self.rawData.raw['x2'],
-                             self.rawData.raw['u1'],
-                             self.rawData.raw['u2'],
-                             self.rawData.raw['T'],
-                             self.rawData.raw['F'],
-                             self.rawData.raw['gamma']]).T
-        ssd_tab = rmNaNrows(raw_tab)
-        ssd_mat = ssd_tab.T
-        ssd = {}
-        ssd['t'] = np.array(ssd_mat[0]).flatten()
-        ssd['x1'] = np.array(ssd_mat[1]).flatten()
-        ssd['x2'] = np.array(ssd_mat[2]).flatten()
-        ssd['u1'] = np.array(ssd_mat[3]).flatten()
-        ssd['u2'] = np.array(ssd_mat[4]).flatten()
-        ssd['T'] = np.array(ssd_mat[5]).flatten()
-        ssd['F'] = np.array(ssd_mat[6]).flatten()
-        ssd['gamma'] = np.array(ssd_mat[7]).flatten()
+        ssd = rc.clean_rows(self.rawData.raw, ['t', 'x1', 'x2', 'u1', 'u2', 'T', 'F', 'gamma'])
         # Find the time discontinuities in SSD Data
         ssd['t_skips'] = find_discontinuities(ssd['t'], self.dt)
+        ssd['segments'] = sg.SegmentIndex(ssd['t_skips'])
         # Smooth all the data
-        for state in ['x1', 'x2', 'u1', 'u2', 'T', 'F', 'gamma']:
-            ssd[state] = sf.sosff_TD(ssd['t_skips'], ssd[state])
+        states = ['x1', 'x2', 'u1', 'u2', 'T', 'F', 'gamma']
+        X = sf.sosff_TD_batch(ssd['segments'], bf.stack_channels(ssd, states), workers=self.filt_workers)
+        ssd.update(bf.unstack_channels(X, states))
         # Set datum for the data
-        ssd = self.set_datum(ssd, type='ssd')
-        # Calculating eta
-        ssd['eta'] = etaCalc.calc_eta_TD(ssd['x1'], ssd['u1'], ssd['t_skips'])
+        ssd = self.set_datum(ssd, type='ssd', channels=['eta'])
         return  ssd
 
     #===================================================================================================================
-    def set_datum(self, ssd, type='ssd'):
-        """Set the minimum values in data sets"""
+    def set_datum(self, ssd, type='ssd', channels=()):
+        """Set the minimum values in data sets and add the derived channels (eta not clamped)"""
         datum = {}
         datum['x1'] = 0
         datum['x2'] = 0
@@ -84,18 +60,17 @@ class FilteredSimData():
             key_set = ssd_keys
         else:
             raise ValueError("type must be 'ssd' or 'iod'")
-        for key in key_set:
-            ssd[key] = np.array([val if val >= datum[key] else datum[key] for val in ssd[key]])
+        ssd = dch.derive_channels(ssd, datum, key_set, channels, clamp=False)
         return ssd
 
 
 # ======================================================================================================================
 
 ## =====================================================================================================================
-def load_filtered_sim_data_set():
-    # Load the test Data
-    ag_tsts = [12, 15]
-    filtered_sim_data = [FilteredSimData(sim_type) for sim_type in range(3)]
+def load_filtered_sim_data_set(workers: int | None = 1, capture_errors: bool = False):
+    # Load the test Data, workers > 1 (or None for all cores) loads the simulations in parallel
+    filtered_sim_data = pl.load_parallel(FilteredSimData, [(sim_type,) for sim_type in range(3)],
+                                         workers=workers, capture_errors=capture_errors)
     return filtered_sim_data
 
 # ======================================================================================================================
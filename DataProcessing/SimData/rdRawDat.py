@@ -37,27 +37,27 @@ class RawSimData():
         # ======================================================================================
         # Mass flow rate is in g/sec
         F_kgmin = np.array(data.get(data.columns[3]), dtype=np.float64).flatten()
-        raw_data['F'] = uc.uConv(F_kgmin,Tscr, "kg/min to 10 g/s")        # g/sec
+        raw_data['F'] = uc.uConv(F_kgmin,Tscr, "kg/min to 10 g/s", in_place=True)        # g/sec
         # print("len(F) = ", np.shape(raw_data['F']))
         # =======================================================================================
         # NOx output is in mol/m^3
         NOx = np.array(data.get(data.columns[6]), dtype=np.float64).flatten()
-        raw_data['x1'] = uc.uConv(NOx, Tscr, "ppm to 10^-3 mol/m^3")
+        raw_data['x1'] = uc.uConv(NOx, Tscr, "ppm to 10^-3 mol/m^3", in_place=True)
         # print("len(x1) = ", np.shape(raw_data['x1']))
         # =======================================================================================
         # NH3 output is in mol/m^3
         NH3 = np.array(data.get(data.columns[7]), dtype=np.float64).flatten()
-        raw_data['x2'] = uc.uConv(NH3, Tscr, "ppm to 10^-3 mol/m^3")
+        raw_data['x2'] = uc.uConv(NH3, Tscr, "ppm to 10^-3 mol/m^3", in_place=True)
         # print("len(x2) = ", np.shape(raw_data['x2']))
         # =======================================================================================
         # NOx input is in mol/m^3
         u1 = np.array(data.get(data.columns[4]), dtype=np.float64).flatten()
-        raw_data['u1'] = uc.uConv(u1, Tscr, "ppm to 10^-3 mol/m^3")
+        raw_data['u1'] = uc.uConv(u1, Tscr, "ppm to 10^-3 mol/m^3", in_place=True)
         # print("len(u1) = ", np.shape(raw_data['u1']))
         # ========================================================================================
         # Urea injection rate is in ml/sec
         u2 = np.array(data.get(data.columns[5]), dtype=np.float64).flatten()
-        raw_data['u2'] = uc.uConv(u2, Tscr, "ml/s to 10^-1 ml/s")
+        raw_data['u2'] = uc.uConv(u2, Tscr, "ml/s to 10^-1 ml/s", in_place=True)
         # print("len(u2) = ", np.shape(raw_data['u2']))
         # u1_sensor = np.array(Data.get(('EONOX_COMP_VALUE', 'ppm'))).flatten()
         # ======================================================================================================
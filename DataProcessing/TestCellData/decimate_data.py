@@ -1,7 +1,10 @@
 import numpy as np
-import decimation as dc
 import filt_data as fd
-import etaCalc
+from DataProcessing import derived_channels as dch
+from DataProcessing import parallel_load as pl
+from DataProcessing import segments as sg
+from DataProcessing import multirate as mr
+from DataProcessing import pyramid as pm
 
 
 class decimatedTestData():
@@ -16,48 +19,54 @@ class decimatedTestData():
         self.iod = self.decimate_iod()
         self.ssd_data_len = len(self.ssd['t'])
         self.iod_data_len = len(self.iod['t'])
+        self.pyramids = {}
 
     # ========================================================================
     def decimate_ssd(self) -> dict[str, np.ndarray]:
         """ Decimate the filtered ssd data """
         ssd_keys = ['x1', 'x2', 'u1', 'u2', 'F', 'T', 'eta', 'mu']
-        ssd = {}
-        for key in ssd_keys:
-            ssd[key] = dc.decimate_withTD(self.filtData.ssd['t_skips'], self.filtData.ssd[key])
-        ssd['t'] = dc.decimate_time2OneHz(self.filtData.ssd['t_skips'], self.filtData.ssd['t'])
-        if self.name == "dg_rmc_2":
-            for key in ssd_keys:
-                ssd[key] = dc.sig.decimate(self.filtData.ssd[key], q=10, n=7, ftype='iir', zero_phase=True)
-            ssd['t'] = np.arange(0, self.filtData.ssd['t'][-1]+1, 1)
+        # Anti-alias filter and downsample all the channels at once, the factor comes from the detected rate
+        ssd = mr.decimate_data(self.filtData.ssd, ssd_keys, self.dt)
         ssd['t_skips'] = fd.find_discontinuities(ssd['t'], self.dt)
+        ssd['segments'] = sg.SegmentIndex(ssd['t_skips'])
         ssd['eta_dec'] = ssd['eta']
-        ssd['eta'] = etaCalc.calc_eta_TD(ssd['x1'], ssd['u1'], ssd['t_skips'])
+        ssd = dch.derive_channels(ssd, channels=['eta'], clamp=True)
         return ssd
 
     # =========================================================================
     def decimate_iod(self):
         """ Decimate the filtered iod data """
         iod_keys = ['y1', 'u1', 'u2', 'F', 'T', 'eta', 'mu']
-        iod = {}
-        for key in iod_keys:
-            iod[key] = dc.decimate_withTD(self.filtData.iod['t_skips'], self.filtData.iod[key])
-        iod['t'] = dc.decimate_time2OneHz(self.filtData.iod['t_skips'], self.filtData.iod['t'])
-        if self.name == "dg_rmc_2":
-            for key in iod_keys:
-                iod[key] = dc.sig.decimate(self.filtData.iod[key], q=10, n=7, ftype='iir', zero_phase=True)
-            iod['t'] = np.arange(0, self.filtData.iod['t'][-1]+1, 1)
+        # Anti-alias filter and downsample all the channels at once, the factor comes from the detected rate
+        iod = mr.decimate_data(self.filtData.iod, iod_keys, self.dt)
         iod['t_skips'] = fd.find_discontinuities(iod['t'], self.dt)
+        iod['segments'] = sg.SegmentIndex(iod['t_skips'])
         iod['eta_dec'] = iod['eta']
-        iod['eta'] = etaCalc.calc_eta_TD(iod['y1'], iod['u1'], iod['t_skips'])
+        iod = dch.derive_channels(iod, channels=['eta'], clamp=True)
         return iod
 
+    # =========================================================================
+    def pyramid(self, data_type: str = 'ssd', dt_levels: tuple = pm.dt_levels) -> pm.SignalPyramid:
+        """ Multi-resolution levels (1 Hz, 0.2 Hz, 0.05 Hz by default) of the filtered ssd or iod
+            All the levels are built in one pass over the filtered data on first use and kept.
+            As in ssd and iod, eta is recomputed at the rate of every level and the decimated one is 'eta_dec'.
+        """
+        if data_type not in ['ssd', 'iod']:
+            raise ValueError("data_type must be 'ssd' or 'iod'")
+        dt_levels = tuple(dt_levels)
+        if (data_type, dt_levels) not in self.pyramids:
+            data = self.filtData.ssd if data_type == 'ssd' else self.filtData.iod
+            self.pyramids[(data_type, dt_levels)] = pm.SignalPyramid(data, dt_levels=dt_levels, gap=1.5,
+                                                                     clamp=True).build()
+        return self.pyramids[(data_type, dt_levels)]
+
 # ======================================================================================================================
 
 ## =====================================================================================================================
-def load_decimated_test_data_set():
-    # Load the test Data
+def load_decimated_test_data_set(workers: int | None = 1, capture_errors: bool = False):
+    # Load the test Data, workers > 1 (or None for all cores) loads the tests in parallel
     ag_tsts = [12, 15]
-    decimated_test_data = [[decimatedTestData(age, tst) for tst in range(ag_tsts[age])] for age in range(2)]
+    decimated_test_data = pl.load_nested(decimatedTestData, ag_tsts, workers=workers, capture_errors=capture_errors)
     return decimated_test_data
 
 # ======================================================================================================================
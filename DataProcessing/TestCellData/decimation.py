@@ -1,5 +1,7 @@
 import numpy as np
 import scipy.signal as sig
+from DataProcessing import segments as sg
+from DataProcessing import multirate as mr
 
 
 # =========================================================================================
@@ -11,20 +13,12 @@ def decimate2OneHz(x):
 # ==========================================================================================
 def decimate_withTD(tskips, x):
     """ Decimate an array with time skips """
-    y = []
-    for i in range(len(tskips)-1):
-        y.append(decimate2OneHz(x[tskips[i]:tskips[i+1]]))
-    return np.array(y).flatten()
+    return np.concatenate([decimate2OneHz(x_seg) for x_seg in sg.as_segments(tskips).views(x)])
 
 # ===========================================================================================
 def decimate_time2OneHz(tskips, t):
     """ Decimated the time of ssd and iod to 1 Hz with time skips """
-    s = []
-    q = 5
-    for i in range(len(tskips)-1):
-        s_des = t[tskips[i]] + np.arange(np.ceil(len(t[tskips[i]:tskips[i+1]])/q))
-        s = np.concatenate((s, s_des), axis=0)
-    return np.array(s).flatten()
+    return mr.decimate_time(tskips, t, q=5, dt_out=1)
 
 # ============================================================================================
 
@@ -1,7 +1,11 @@
 import numpy as np
 import rdRawDat as rd
 import sosFiltering as sf
-import etaCalc
+from DataProcessing import row_cleaning as rc
+from DataProcessing import derived_channels as dch
+from DataProcessing import parallel_load as pl
+from DataProcessing import segments as sg
+from DataProcessing import batch_filtering as bf
 
 # Array Manipulating functions ------------------------------------------------------
 #==============================================================================================
@@ -9,39 +13,19 @@ def find_discontinuities(t, dt):
     """Find the discontinuities in the time Data
     The slices would be: [ [t_skips[0], t_skips[1]], ... [t_skips[n-1], t_skips[n]] ]
     """
-    t_skips = np.array([i for i in range(1, len(t))
-                        if t[i] - t[i - 1] > 1.5 * dt], dtype=int)
-    t_skips = np.append(t_skips, len(t))            # Included the len(t) to follow the slicing rule of open interval
-    t_skips = np.insert(t_skips, 0, 0)
-    return t_skips
-
-
-# =============================================================================================
-def rmNaNrows(x):
-    """Remove the rows with NaN values"""
-    return np.delete(x,
-                     [i for i in range(len(x))
-                         if np.any(np.isnan(x[i]))],
-                     axis=0)
-
-# =============================================================================================
-def rmLowTemprows(x):
-    """Remove the rows with temperature less than T0.
-        The commercial NOx sensor does not work bellow this temperature.
-    """
-    Tmin = 0    # 200 deg-C
-    Tmax = 11   # 310 deg-C
-    return np.delete(x,
-                     [i for i in range(len(x))
-                         if (x[i, -3]<Tmin or x[i, -3]>Tmax)],
-                     axis=0)
+    # The offsets include 0 and len(t) to follow the slicing rule of open interval
+    return sg.find_segments(t, 1.5 * dt).offsets
+
+
+# Temperature window of the rows kept in the FTP data, the commercial NOx sensor does not work outside it
+T_window = (0, 11)      # 200 - 310 deg-C
 
 
 #===============================================================================================
 class FilteredTestData():
     """Class of filtered test data both ssd and iod"""
     #===========================================================================================
-    def __init__(self, age: int, test_type: int):
+    def __init__(self, age: int, test_type: int, filt_workers: int | None = 1, shared: bool = False):
         # Data set names
         self.hftp_set = ["dg_hftp", "dg_hftp_1", "dg_hftp_2", "dg_hftp_3",
                          "aged_hftp", "aged_hftp_1", "aged_hftp_2", "aged_hftp_3", "aged_hftp_4"]
@@ -53,100 +37,116 @@ class FilteredTestData():
         self.rawData = rd.RawTestData(age, test_type)
         self.dt = self.rawData.dt
         self.name = self.rawData.name
-        self.ssd = self.gen_ssd()
-        self.iod = self.gen_iod()
+        self.filt_workers = filt_workers     # Threads filtering the segments, None for all cores
+        if shared:
+            self.ssd, self.iod = self.gen_shared()
+        else:
+            self.ssd = self.gen_ssd()
+            self.iod = self.gen_iod()
+
+    # ==========================================================================================
+    def row_rules(self) -> tuple[int, tuple | None]:
+        """ Returns the number of rows skipped at the start and the temperature window of the data set """
+        n_skip = 0
+        T_bounds = None
+        if self.name in self.cftp_set:
+            # Clearing non-existant y1 bellow 950s of cFTP data
+            n_skip = int(950/self.dt)
+        elif self.name in self.hftp_set:
+            # Clearing first 275 s of hFTP data and the low-temperature rows
+            # The tail region is cross sensitive to tail-pipe ammonia in dg-hftp case
+            n_skip = int(275/self.dt)
+            T_bounds = T_window
+        return n_skip, T_bounds
 
     # ==========================================================================================
     def gen_ssd(self) -> dict[str, np.ndarray]:
         # Generate the state space Data
-        raw_tab = np.matrix([self.rawData.raw['t'],
-                             self.rawData.raw['x1'],
-                             self.rawData.raw['x2'],
-                             self.rawData.raw['u1'],
-                             self.rawData.raw['u2'],
-                             self.rawData.raw['T'],
-                             self.rawData.raw['F'],
-                             self.rawData.raw['mu']]).T
         # Removing non-usefull rows in the data
-        # Clearing first 275 sec of FTP data
-        if self.name in self.cftp_set:
-            # print("clearing non-existant y1 bellow 950s in " + self.name + " data for iod")
-            raw_tab = np.copy(raw_tab[int(950/self.dt):])
-        if self.name in self.hftp_set:
-            # print("clearing first 275 s of data in " + self.name + " data for ssd")
-            raw_tab = np.copy(raw_tab[int(275/self.dt):])
-            # print("removing low-temperature data bellow 200 deg-C in " + self.name + " data for ssd")
-            raw_tab = rmLowTemprows(raw_tab)
-        ssd_tab = rmNaNrows(raw_tab)
-        # ===
-        ssd_mat = ssd_tab.T
-        ssd = {}
-        ssd['t'] = np.array(ssd_mat[0]).flatten()
-        ssd['x1'] = np.array(ssd_mat[1]).flatten()
-        ssd['x2'] = np.array(ssd_mat[2]).flatten()
-        ssd['u1'] = np.array(ssd_mat[3]).flatten()
-        ssd['u2'] = np.array(ssd_mat[4]).flatten()
-        ssd['T'] = np.array(ssd_mat[5]).flatten()
-        ssd['F'] = np.array(ssd_mat[6]).flatten()
-        ssd['mu'] = np.array(ssd_mat[7]).flatten()
+        n_skip, T_bounds = self.row_rules()
+        ssd = rc.clean_rows(self.rawData.raw, ['t', 'x1', 'x2', 'u1', 'u2', 'T', 'F', 'mu'],
+                            T_bounds=T_bounds, n_skip=n_skip)
         # Find the time discontinuities in SSD Data
         ssd['t_skips'] = find_discontinuities(ssd['t'], self.dt)
+        ssd['segments'] = sg.SegmentIndex(ssd['t_skips'])
         # Smooth all the data
-        for state in ['x1', 'x2', 'u1', 'u2', 'T', 'F', 'mu']:
-            ssd[state] = sf.sosff_TD(ssd['t_skips'], ssd[state])
+        states = ['x1', 'x2', 'u1', 'u2', 'T', 'F', 'mu']
+        X = sf.sosff_TD_batch(ssd['segments'], bf.stack_channels(ssd, states), workers=self.filt_workers)
+        ssd.update(bf.unstack_channels(X, states))
         # Set datum for the data
-        ssd = self.set_datum(ssd, type='ssd')
-        # Calculating eta
-        ssd['eta'] = etaCalc.calc_eta_TD(ssd['x1'], ssd['u1'], ssd['t_skips'])
+        ssd = self.set_datum(ssd, type='ssd', channels=['eta'])
         return  ssd
 
     # ===========================================================================================
     def gen_iod(self) -> dict[str, np.ndarray]:
         # Generate the input output Data
-        raw_tab = np.matrix([self.rawData.raw['t'],
-                             self.rawData.raw['y1'],
-                             self.rawData.raw['u1'],
-                             self.rawData.raw['u2'],
-                             self.rawData.raw['T'],
-                             self.rawData.raw['F'],
-                             self.rawData.raw['mu']]).T
-        #===
         # Removing non-usefull rows in the data
         # Clearing non-existant iod data, y1 doesn't work bellow a certain temperature
-        if self.name in self.cftp_set:
-            # print("clearing non-existant y1 bellow 950s in " + self.name + " data for iod")
-            raw_tab = np.copy(raw_tab[int(950/self.dt):])
-        elif self.name in self.hftp_set:
-            # print("clearing non-existant y1 bellow 275s in " + self.name + " data for iod")
-            raw_tab = np.copy(raw_tab[int(275/self.dt):])
-            # The tail region is cross sensitive to tail-pipe ammonia in dg-hftp case
-            # print("removing low-temperature data bellow 200 deg-C in " + self.name + " data for iod")
-            raw_tab = rmLowTemprows(raw_tab)
-        iod_tab = rmNaNrows(raw_tab)
-        # ====
-        iod_mat = iod_tab.T
-        iod = {}
-        iod['t'] = np.array(iod_mat[0]).flatten()
-        iod['y1'] = np.array(iod_mat[1]).flatten()
-        iod['u1'] = np.array(iod_mat[2]).flatten()
-        iod['u2'] = np.array(iod_mat[3]).flatten()
-        iod['T'] = np.array(iod_mat[4]).flatten()
-        iod['F'] = np.array(iod_mat[5]).flatten()
-        iod['mu'] = np.array(iod_mat[6]).flatten()
+        n_skip, T_bounds = self.row_rules()
+        iod = rc.clean_rows(self.rawData.raw, ['t', 'y1', 'u1', 'u2', 'T', 'F', 'mu'],
+                            T_bounds=T_bounds, n_skip=n_skip)
         # Find the time discontinuities in IOD Data
         iod['t_skips'] = find_discontinuities(iod['t'], self.dt)
+        iod['segments'] = sg.SegmentIndex(iod['t_skips'])
         # Smooth all the data
-        for state in ['y1', 'u1', 'u2', 'T', 'F', 'mu']:
-            iod[state]= sf.sosff_TD(iod['t_skips'], iod[state])
+        states = ['y1', 'u1', 'u2', 'T', 'F', 'mu']
+        X = sf.sosff_TD_batch(iod['segments'], bf.stack_channels(iod, states), workers=self.filt_workers)
+        iod.update(bf.unstack_channels(X, states))
         # Set datum for the data
-        iod = self.set_datum(iod, type='iod')
-        # Calculate eta
-        iod['eta'] = etaCalc.calc_eta_TD(iod['y1'], iod['u1'], iod['t_skips'])
+        iod = self.set_datum(iod, type='iod', channels=['eta'])
         return iod
 
+    # ===========================================================================================
+    def gen_shared(self) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+        """ Generates ssd and iod with the common channels filtered only once where the data sets share a segment
+            A segment with the same rows in ssd and iod has its common channels filtered once for both, the other
+            segments (and x1, x2, y1) are filtered on their own data set, so the result is gen_ssd() and gen_iod().
+        """
+        n_skip, T_bounds = self.row_rules()
+        raw = self.rawData.raw
+        common = ['t', 'u1', 'u2', 'T', 'F', 'mu']
+        states = ['u1', 'u2', 'T', 'F', 'mu']
+        set_rules = [(['x1', 'x2'], 'ssd'), (['y1'], 'iod')]
+        # Raw rows and segments of each data set
+        rows, segments = [], []
+        for own, _ in set_rules:
+            r = np.flatnonzero(rc.keep_mask([raw[key] for key in common + own], raw['T'], T_bounds, n_skip))
+            rows.append(r)
+            segments.append(sg.SegmentIndex(find_discontinuities(np.asarray(raw['t'])[r], self.dt)))
+        # Segments made of the same raw rows in both data sets
+        shared = [np.zeros(segs.n, dtype=bool) for segs in segments]
+        slices = segments[0].slices()
+        spans = {(rows[0][a], n): k for k, (a, n) in enumerate(zip(segments[0].starts, segments[0].lengths)) if n > 0}
+        for k, (a, n) in enumerate(zip(segments[1].starts, segments[1].lengths)):
+            k0 = spans.get((rows[1][a], n)) if n > 0 else None
+            if k0 is not None and np.array_equal(rows[0][slices[k0]], rows[1][a:a + n]):
+                shared[0][k0] = shared[1][k] = True
+        # Filter the common channels of the shared segments once
+        in_shared = [sh[segs.segment_ids()] for sh, segs in zip(shared, segments)]
+        shared_rows = rows[0][in_shared[0]]
+        shared_segs = sg.SegmentIndex(np.concatenate(([0], np.cumsum(segments[0].lengths[shared[0]]))))
+        X_shared = sf.sosff_TD_batch(shared_segs, np.stack([np.asarray(raw[key])[shared_rows] for key in states]),
+                                     workers=self.filt_workers)
+        # Derive the data sets, filtering their own channels and the segments they do not share
+        data_sets = []
+        for (own, set_type), r, segs, sh, in_sh in zip(set_rules, rows, segments, shared, in_shared):
+            data = {key: np.asarray(raw[key])[r] for key in common}
+            data['t_skips'] = segs.offsets
+            data['segments'] = segs
+            X = bf.stack_channels(data, states)
+            X[:, in_sh] = X_shared
+            rest_segs = sg.SegmentIndex(np.concatenate(([0], np.cumsum(segs.lengths[~sh]))))
+            X[:, ~in_sh] = sf.sosff_TD_batch(rest_segs, X[:, ~in_sh], workers=self.filt_workers)
+            data.update(bf.unstack_channels(X, states))
+            X = sf.sosff_TD_batch(segs, np.stack([np.asarray(raw[key])[r] for key in own]), workers=self.filt_workers)
+            data.update(bf.unstack_channels(X, own))
+            data = self.set_datum(data, type=set_type, channels=['eta'])
+            data_sets.append(data)
+        return data_sets[0], data_sets[1]
+
     #===================================================================================================================
-    def set_datum(self, ssd, type='ssd'):
-        """Set the minimum values in data sets"""
+    def set_datum(self, ssd, type='ssd', channels=()):
+        """Set the minimum values in data sets and add the derived channels (eta clamped at 0)"""
         datum = {}
         datum['x1'] = 0
         datum['x2'] = 0
@@ -163,18 +163,19 @@ class FilteredTestData():
             key_set = iod_keys
         else:
             raise ValueError("type must be 'ssd' or 'iod'")
-        for key in key_set:
-            ssd[key] = np.array([val if val >= datum[key] else datum[key] for val in ssd[key]])
+        ssd = dch.derive_channels(ssd, datum, key_set, channels, clamp=True)
         return ssd
 
 
 # ======================================================================================================================
 
 ## =====================================================================================================================
-def load_filtered_test_data_set():
-    # Load the test Data
+def load_filtered_test_data_set(workers: int | None = 1, capture_errors: bool = False, shared: bool = False):
+    # Load the test Data, workers > 1 (or None for all cores) loads the tests in parallel
+    # shared filters the channels common to ssd and iod only once on the segments they share
     ag_tsts = [12, 15]
-    filtered_test_data = [[FilteredTestData(age, tst) for tst in range(ag_tsts[age])] for age in range(2)]
+    filtered_test_data = pl.load_nested(FilteredTestData, ag_tsts, extra_args=(1, shared), workers=workers,
+                                        capture_errors=capture_errors)
     return filtered_test_data
 
 # ======================================================================================================================
@@ -1,6 +1,49 @@
 import numpy as np
 from pandas import read_csv
 import unit_convs as uc
+from DataProcessing import array_store as ast
+from DataProcessing import parallel_load as pl
+
+# Logical channels and the (name, unit) columns that can hold them, in order of preference.
+# The older and the newer test-cell logs name some of the channels differently.
+channels = {'t':    [('LOG_TM', 'sec')],
+            'Tin':  [('V_AIM_TRC_DPF_OUT', 'Deg_C')],
+            'Tout': [('V_AIM_TRC_SCR_OUT', 'Deg_C')],
+            'F':    [('EXHAUST_FLOW', 'kg/min')],
+            'x1':   [('EXH_CW_NOX_COR_U1', 'PPM'), ('EXH_CW_NOX_FTIR_COR_U2', 'PPM'), ('EXH_CW_NOX_FTIR_MEA', 'PPM')],
+            'x2':   [('EXH_CW_AMMONIA_MEA', 'ppm')],
+            'y1':   [('V_SCM_PPM_SCR_OUT_NOX', 'ppm'), ('V_SCM_PPM_SCR_OUT_NOX_PRECLAMP', 'ppm')],
+            'u1':   [('ENG_CW_NOX_FTIR_COR_U2', 'PPM'), ('EONOX_COMP_VALUE', 'ppm')],
+            'u2':   [('V_UIM_FLM_ESTUREAINJRATE', 'ml/sec')],
+            'mu':   [('V_SCR_ANR_FDBK', 'None')]}
+
+# ======================================================================================================================
+def probe_header(dat_file: str) -> list[tuple[str, str]]:
+    """Reads only the two header rows (name, unit) of a test-cell csv"""
+    return list(read_csv(dat_file, header=[0, 1], nrows=0).columns)
+
+# ======================================================================================================================
+def resolve_columns(header: list[tuple[str, str]], chans: dict[str, list]) -> dict[str, int]:
+    """Returns the column position that holds each logical channel"""
+    positions = {}
+    for i, col in enumerate(header):
+        positions.setdefault(col, i)
+    cols = {}
+    for key, candidates in chans.items():
+        found = [positions[col] for col in candidates if col in positions]
+        if not found:
+            raise KeyError("None of the columns " + str(candidates) + " for '" + key + "' are in the data")
+        cols[key] = found[0]
+    return cols
+
+# ======================================================================================================================
+def read_channels(dat_file: str, chans: dict[str, list] = channels) -> dict[str, np.ndarray]:
+    """Parses only the columns of the logical channels as float64 arrays"""
+    cols = resolve_columns(probe_header(dat_file), chans)
+    usecols = sorted(set(cols.values()))
+    data = read_csv(dat_file, header=None, skiprows=2, usecols=usecols,
+                    dtype={i: np.float64 for i in usecols}, engine='c')
+    return {key: data[i].to_numpy(dtype=np.float64) for key, i in cols.items()}
 
 
 class RawTestData():
@@ -14,68 +57,46 @@ class RawTestData():
         self.name = self.test_name(age, test_type)
         # print(self.name)
         self.dat_file = self.data_dir()
-        self.raw = self.load_test_data()
+        try:
+            self.raw = self.load_cache()
+        except FileNotFoundError:
+            self.raw = self.load_test_data()
+            self.cache_data()
 
     # ==============================================================
     def load_test_data(self) -> dict[str, np.ndarray]:
         """Loads the test data"""
-        data = read_csv(self.dat_file, header=[0, 1])
+        data = read_channels(self.dat_file)
         raw_data = {}
         # ======================================================================================
         # Assigning the Data to the variables
         # Time is in seconds
-        raw_data['t'] = np.array(data.get(('LOG_TM', 'sec')), dtype=np.float64).flatten()
-        # print("len(t) = ", np.shape(raw_data['t']))
+        raw_data['t'] = data['t']
         # ======================================================================================
         # Temperature is in deg-C
-        Tin = np.array(data.get(('V_AIM_TRC_DPF_OUT', 'Deg_C')), dtype=np.float64).flatten()
-        Tout = np.array(data.get(('V_AIM_TRC_SCR_OUT', 'Deg_C')), dtype=np.float64).flatten()
-        Tscr = np.mean([Tin, Tout], axis=0).flatten()
+        Tscr = np.mean([data['Tin'], data['Tout']], axis=0).flatten()
         raw_data['T'] = uc.uConv(Tscr, Tscr, "-T0C")
-        # print("len(T) = ", np.shape(raw_data['T']))
         # ======================================================================================
         # Mass flow rate is in g/sec
-        F_kgmin = np.array(data.get(('EXHAUST_FLOW', 'kg/min')), dtype=np.float64).flatten()
-        raw_data['F'] = uc.uConv(F_kgmin,Tscr, "kg/min to 10 g/s")        # g/sec
-        # print("len(F) = ", np.shape(raw_data['F']))
+        raw_data['F'] = uc.uConv(data['F'], Tscr, "kg/min to 10 g/s")        # g/sec
         # =======================================================================================
         # NOx output is in mol/m^3
-        NOx = np.array(data.get(('EXH_CW_NOX_COR_U1', 'PPM')), dtype=np.float64).flatten()
-        if len(NOx) != len(raw_data['t']):   # For the new data set
-            NOx = np.array(data.get(('EXH_CW_NOX_FTIR_COR_U2', 'PPM')), dtype=np.float64).flatten()
-        if len(NOx) != len(raw_data['t']):
-            NOx = np.array(data.get(('EXH_CW_NOX_FTIR_MEA', 'PPM')), dtype=np.float64).flatten()
-        raw_data['x1'] = uc.uConv(NOx, Tscr, "ppm to 10^-3 mol/m^3")
-        # print("len(x1) = ", np.shape(raw_data['x1']))
+        raw_data['x1'] = uc.uConv(data['x1'], Tscr, "ppm to 10^-3 mol/m^3")
         # =======================================================================================
         # NH3 output is in mol/m^3
-        NH3 = np.array(data.get(('EXH_CW_AMMONIA_MEA', 'ppm')), dtype=np.float64).flatten()
-        raw_data['x2'] = uc.uConv(NH3, Tscr, "ppm to 10^-3 mol/m^3")
-        # print("len(x2) = ", np.shape(raw_data['x2']))
+        raw_data['x2'] = uc.uConv(data['x2'], Tscr, "ppm to 10^-3 mol/m^3")
         # =======================================================================================
         # NOx out measured in mol/m^3
-        y1 = np.array(data.get(('V_SCM_PPM_SCR_OUT_NOX', 'ppm')), dtype=np.float64).flatten()
-        if len(y1) != len(raw_data['t']):       # For the new data-set
-            y1 = np.array(data.get(('V_SCM_PPM_SCR_OUT_NOX_PRECLAMP', 'ppm')), dtype=np.float64).flatten()
-        raw_data['y1'] = uc.uConv(y1, Tscr, "ppm to 10^-3 mol/m^3")
-        # print("len(y1) = ", np.shape(raw_data['y1']))
+        raw_data['y1'] = uc.uConv(data['y1'], Tscr, "ppm to 10^-3 mol/m^3")
         # =======================================================================================
         # NOx input is in mol/m^3
-        u1 = np.array(data.get(('ENG_CW_NOX_FTIR_COR_U2', 'PPM')), dtype=np.float64).flatten()
-        if len(u1) != len(raw_data['t']):
-            u1 = np.array(data.get(('EONOX_COMP_VALUE', 'ppm')), dtype=np.float64).flatten()
-        raw_data['u1'] = uc.uConv(u1, Tscr, "ppm to 10^-3 mol/m^3")
-        # print("len(u1) = ", np.shape(raw_data['u1']))
+        raw_data['u1'] = uc.uConv(data['u1'], Tscr, "ppm to 10^-3 mol/m^3")
         # ========================================================================================
         # Urea injection rate is in ml/sec
-        u2 = np.array(data.get(('V_UIM_FLM_ESTUREAINJRATE', 'ml/sec')), dtype=np.float64).flatten()
-        raw_data['u2'] = uc.uConv(u2, Tscr, "ml/s to 10^-1 ml/s")
-        # print("len(u2) = ", np.shape(raw_data['u2']))
-        # u1_sensor = np.array(Data.get(('EONOX_COMP_VALUE', 'ppm'))).flatten()
+        raw_data['u2'] = uc.uConv(data['u2'], Tscr, "ml/s to 10^-1 ml/s")
         # ======================================================================================================
         # Ammonia to NOx ratio at the inlet
-        mu = np.array(data.get(('V_SCR_ANR_FDBK', 'None')), dtype=np.float64).flatten()
-        raw_data['mu'] = mu
+        raw_data['mu'] = data['mu']
         return raw_data
 
     # ==============================================================
@@ -133,12 +154,27 @@ class RawTestData():
         return dir_prefix + test_dict[self.name]
 
     # ===============================================================
+    def cache_dir(self) -> str:
+        """Returns the directory of the converted-array cache of this test"""
+        return "./DataProcessing/TestCellData/npy_files/" + self.name
+
+    # ===============================================================
+    def cache_data(self):
+        """Writes the converted channels to the array cache"""
+        ast.save_arrays(self.cache_dir(), self.raw, self.dat_file, uc.conv_version)
+
+    # ===============================================================
+    def load_cache(self) -> dict[str, np.ndarray]:
+        """Opens the cached channels memory-mapped, raises FileNotFoundError if missing or stale"""
+        return ast.load_arrays(self.cache_dir(), self.dat_file, uc.conv_version)
+
+    # ===============================================================
 
 ## =====================================================================================================================
-def load_test_data_set():
-    # Load the test Data
+def load_test_data_set(workers: int | None = 1, capture_errors: bool = False):
+    # Load the test Data, workers > 1 (or None for all cores) loads the tests in parallel
     ag_tsts = [12, 15]
-    test_data = [[RawTestData(age, tst) for tst in range(ag_tsts[age])] for age in range(2)]
+    test_data = pl.load_nested(RawTestData, ag_tsts, workers=workers, capture_errors=capture_errors)
     return test_data
 
 # ======================================================================================================================
@@ -1,18 +1,19 @@
 import numpy as np
 import  scipy.signal as sig
+from DataProcessing import segments as sg
+from DataProcessing import batch_filtering as bf
 
 lp_filt = sig.cheby2(7,40,  0.1, 'low', analog=False, fs=5, output='sos')
 
 def sosff_TD(tskips, x: np.ndarray) -> np.ndarray:
-    """Filter the data with time jumps"""
-    pad_len = 24
-    y = np.zeros(np.shape(x))
-    for i in range(1, len(tskips)):
-        if len(x[tskips[i-1]:tskips[i]]) > pad_len:
-            y[tskips[i-1]:tskips[i]] = sig.sosfiltfilt(lp_filt, x[tskips[i-1]:tskips[i]])
-        else:
-            y[tskips[i - 1]:tskips[i]] = x[tskips[i - 1]:tskips[i]]
-    return y
+    """Filter the data with time jumps, tskips is a SegmentIndex or the t_skips offsets"""
+    return sosff_TD_batch(tskips, np.atleast_2d(x))[0]
+
+def sosff_TD_batch(tskips, X: np.ndarray, workers: int | None = 1) -> np.ndarray:
+    """Filter the rows (channels) of X together, one sosfiltfilt call per segment
+    workers > 1 (or None for all cores) filters the segments in a thread pool
+    """
+    return bf.sosfiltfilt_segments(lp_filt, sg.as_segments(tskips), X, pad_len=24, workers=workers)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,12 @@
 import numpy as np
 from DataProcessing.TruckData import rdRawDat as rd
-from DataProcessing.TruckData import etaCalc
 import scipy.signal as sig
 from DataProcessing.TruckData.sosFiltering import drive_cycle_filt
+from DataProcessing import parallel_load as pl
+from DataProcessing import row_cleaning as rc
+from DataProcessing import derived_channels as dch
+from DataProcessing import segments as sg
+from DataProcessing import ragged as rg
 
 
 # Array Manipulating functions ------------------------------------------------------
@@ -12,35 +16,23 @@ def find_drive_cycles(t, gap: int =60):      # 1 min gap
         """Find the discontinuities in the time Data
         The slices would be: [ [t_skips[0], t_skips[1]], [t_skips[1], t_skips[2]],... [t_skips[n-1], t_skips[n]] ]
         """
-        t_skips = np.array([i for i in range(1, len(t)) if t[i] - t[i - 1] > gap], dtype=int)
-        t_skips = np.append(t_skips, len(t))  # Included the len(t) to follow the slicing rule of open interval
-        t_skips = np.insert(t_skips, 0, 0)
-        return t_skips
+        # The offsets include 0 and len(t) to follow the slicing rule of open interval
+        return sg.find_segments(t, gap).offsets
 
 # =============================================================================================
 
-def rmNaNrows(x):
-        """Remove the rows with NaN values"""
-        return np.delete(x, [i for i in range(len(x)) if np.any(np.isnan(x[i]))], axis=0)
-
-# =============================================================================================
-
-def rmLowTemprows(x):
-        """Remove the rows with temperature less than T0.
-        The commercial NOx sensor does not work bellow this temperature.
-        """
-        Tmin = 0   # 200 deg-C
-        Tmax = 10   # 300 deg-C
-        return np.delete(x, [i for i in range(len(x)) if (x[i, 4]<Tmin or x[i, 4]>Tmax)], axis=0)
+# Temperature window of the rows kept, the commercial NOx sensor does not work outside it
+T_window = (0, 10)      # 200 - 300 deg-C
 
 #===============================================================================================
 
 class DriveCycle():
         """ Class dividing the truck data into individual drive cycles and linearly interpolating missing data """
         #===========================================================================================
-        def __init__(self, age: int, test_type: int, gap: int =60):
+        def __init__(self, age: int, test_type: int, gap: int =60, workers: int | None = 1):
                 self.rawData = rd.RawTruckData(age, test_type)
                 self.gap = gap
+                self.workers = workers          # Processes generating the drive cycles, None for all cores
                 self.dt = 1
                 self.name = self.rawData.name
                 self.iod = self.gen_iod()
@@ -48,18 +40,6 @@ class DriveCycle():
 
         # ===================================================
 
-        def sort_drive_cycles(self, drive_cycles_unsorted):
-                """ Sorts the drive cycles to get the longest one at 0 """
-                drive_cycle_lens = np.array([drive_cycles_unsorted[str(i)]['data_len'] for i in range(self.N_dc)])
-                sorted_indices = np.argsort(drive_cycle_lens)
-                drive_cycles = dict()
-                for i in range(self.N_dc):
-                        drive_cycles[str(i)] = drive_cycles_unsorted[str(sorted_indices[-i-1])]
-                return drive_cycles
-
-
-        # ====================================================================
-
         def get_drive_cycle_data(self, j):
                 """ returns the iod data for the ith drive cycle """
                 ssd = dict()
@@ -73,46 +53,32 @@ class DriveCycle():
 
         def gen_drive_cycles(self):
                 """ Returns the drive cycles dictionary with all the contiguous filtered data """
-                N_dc = len(self.iod['drive_cycles'])-1
-                drive_cycles_unsorted = dict()
-                k = 0
-                for j in range(N_dc):
-                        data = self.get_drive_cycle_data(j)
-                        ssd = dict()
-                        ssd['t'] = np.arange(np.min(data['t']), np.max(data['t']))
-                        ssd['data_len'] = len(ssd['t'])
-                        if ssd['data_len'] > 1200:  # Only consider drive cycles longer than 20 minutes
-                                for key in ['y1', 'u1', 'u2', 'T', 'F']:
-                                        interp_data = np.interp(ssd['t'], data['t'], data[key])
-                                        ssd[key] = sig.sosfiltfilt(drive_cycle_filt, interp_data)
-                                ssd = set_datum(ssd)
-                                ssd['eta'] = etaCalc.calc_eta(ssd['y1'], ssd['u1'])
-                                drive_cycles_unsorted[str(k)] = ssd
-                                k += 1
-                        else:
-                                continue
-                self.N_dc = k
-                return self.sort_drive_cycles(drive_cycles_unsorted)
+                t = self.iod['t']
+                cycle_args = []
+                for seg in sg.SegmentIndex(self.iod['drive_cycles']).slices():
+                        t_seg = t[seg]
+                        if len(t_seg) > 0 and np.ceil(np.max(t_seg) - np.min(t_seg)) > 1200:  # Only consider drive cycles longer than 20 minutes
+                                cycle_args.append((t_seg, np.stack([self.iod[key][seg] for key in dc_keys])))
+                drive_cycles = pl.load_parallel(gen_drive_cycle, cycle_args, workers=self.workers)
+                # Pack the cycles longest first into one buffer per channel, drive_cycles are views into it
+                self.cycles = rg.RaggedCycles.from_cycles(drive_cycles, ['t'] + dc_keys + ['eta'],
+                                                          labels=[self.name] * len(drive_cycles))
+                self.N_dc = len(self.cycles)
+                return self.cycles.as_dict()
+
+        # ===========================================================================================
+
+        def gap_sweep(self, gaps: list[int]) -> dict[int, dict]:
+                """ Segmentation and qualifying-cycle statistics of the cleaned data for every gap, without
+                    rebuilding the drive cycles
+                """
+                return gap_sweep(self.iod['t'], gaps)
 
         # ===========================================================================================
 
         def gen_iod(self) -> dict[str, np.ndarray]:
                 # Generate the input output Data
-                raw_tab = np.matrix([self.rawData.raw['t'],
-                                     self.rawData.raw['y1'],
-                                     self.rawData.raw['u1'],
-                                     self.rawData.raw['u2'],
-                                     self.rawData.raw['T'],
-                                     self.rawData.raw['F']]).T
-                iod_tab = rmLowTemprows(rmNaNrows(raw_tab))
-                iod_mat = iod_tab.T
-                iod = {}
-                iod['t'] = np.array(iod_mat[0]).flatten()
-                iod['y1'] = np.array(iod_mat[1]).flatten()
-                iod['u1'] = np.array(iod_mat[2]).flatten()
-                iod['u2'] = np.array(iod_mat[3]).flatten()
-                iod['T'] = np.array(iod_mat[4]).flatten()
-                iod['F'] = np.array(iod_mat[5]).flatten()
+                iod = rc.clean_rows(self.rawData.raw, ['t', 'y1', 'u1', 'u2', 'T', 'F'], T_bounds=T_window)
                 # Find the time discontinuities in IOD Data
                 iod['drive_cycles'] = find_drive_cycles(iod['t'], gap=self.gap)
                 # Set datum for the data
@@ -121,24 +87,132 @@ class DriveCycle():
 
 # =======================================================================================================
 
-def set_datum(ssd):
-        """Set the minimum values in data sets"""
+class DayDriveCycle(DriveCycle):
+        """ Drive cycles of one day file of a multi-day truck """
+        def __init__(self, day_name: str, gap: int =60, workers: int | None = 1):
+                self.rawData = rd.RawTruckDay(day_name)
+                self.gap = gap
+                self.workers = workers
+                self.dt = 1
+                self.name = self.rawData.name
+                self.iod = self.gen_iod()
+                self.drive_cycles = self.gen_drive_cycles()
+
+# =======================================================================================================
+
+def stream_drive_cycles(trk_name: str, gap: int =60, workers: int | None = 1):
+        """ Yields (day_name, drive_cycle) for all the drive cycles of a multi-day truck.
+            Only one day file is in memory at a time, so the peak memory is that of the largest day.
+            The cycles of each day come longest first and cycles do not continue across day files.
+            workers > 1 (or None for all cores) generates the cycles of a day in a process pool.
+        """
+        for day_name in rd.multi_day_trucks[trk_name]:
+                day = DayDriveCycle(day_name, gap, workers)
+                day_cycles = [day.cycles[j] for j in range(day.N_dc)]
+                del day         # Drop the raw and iod arrays of the day before handing out its cycles
+                for ssd in day_cycles:
+                        yield day_name, ssd
+
+# =======================================================================================================
+
+def stream_fleet_drive_cycles(gap: int =60, workers: int | None = 1):
+        """ Yields (trk_name, day_name, drive_cycle) for all the multi-day trucks, one day file at a time """
+        for trk_name in rd.multi_day_trucks.keys():
+                for day_name, ssd in stream_drive_cycles(trk_name, gap, workers):
+                        yield trk_name, day_name, ssd
+
+# =======================================================================================================
+
+def fleet_drive_cycles(gap: int =60, workers: int | None = 1) -> rg.RaggedCycles:
+        """ All the drive cycles of the multi-day trucks in one ragged set, longest first
+            The days are read one at a time and only their packed cycles are kept, labelled with the day name.
+        """
+        days = []
+        for trk_name in rd.multi_day_trucks.keys():
+                for day_name in rd.multi_day_trucks[trk_name]:
+                        day = DayDriveCycle(day_name, gap, workers)
+                        if day.N_dc > 0:
+                                days.append(day.cycles)
+                        del day
+        if len(days) == 0:
+                return rg.RaggedCycles.from_cycles([], ['t'] + dc_keys + ['eta'])
+        return rg.RaggedCycles.concatenate(days)
+
+# =======================================================================================================
+
+def gap_sweep(t: np.ndarray, gaps: list[int], min_len: int = 1200) -> dict[int, dict]:
+        """ Drive-cycle segmentation of t for every gap in one pass over the time differences
+            Returns for each gap: 'drive_cycles' (the offsets find_drive_cycles gives), 'n_segments', the
+            'lengths' (s) of the cycles longer than min_len, 'n_cycles' and their 'total_len'.
+        """
+        t = np.asarray(t)
+        sweep = {}
+        for gap, segs in sg.sweep_segments(t, gaps).items():
+                full = segs.lengths > 0                 # Empty t gives one zero-length segment
+                if len(t) == 0 or not np.any(full):
+                        sweep[gap] = {'drive_cycles': segs.offsets, 'n_segments': 0, 'lengths': np.zeros(0),
+                                      'n_cycles': 0, 'total_len': 0.}
+                        continue
+                durations = np.ceil(t[segs.stops[full] - 1] - t[segs.starts[full]])
+                lengths = durations[durations > min_len]
+                sweep[gap] = {'drive_cycles': segs.offsets,
+                              'n_segments': segs.n,
+                              'lengths': lengths,
+                              'n_cycles': len(lengths),
+                              'total_len': np.sum(lengths)}
+        return sweep
+
+# =======================================================================================================
+
+# Channels of the drive cycles
+dc_keys = ['y1', 'u1', 'u2', 'T', 'F']
+
+def interp_cycle(t: np.ndarray, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ Linearly interpolates all the rows (channels) of X sampled at t onto the integer grid
+            np.arange(min(t), max(t)) with one gather per cycle (same values as np.interp row by row)
+        """
+        order = np.argsort(t, kind='stable')
+        t, X = t[order], X[:, order]
+        grid = np.arange(t[0], t[-1])
+        j = np.clip(np.searchsorted(t, grid, side='right') - 1, 0, len(t) - 2)
+        dt = t[j+1] - t[j]
+        w = np.divide(grid - t[j], dt, out=np.zeros(len(grid)), where=dt > 0)
+        X0 = X[:, j]
+        return grid, X0 + (X[:, j+1] - X0) * w
+
+# =======================================================================================================
+
+def gen_drive_cycle(t: np.ndarray, X: np.ndarray) -> dict[str, np.ndarray]:
+        """ Drive cycle of the rows of X (dc_keys) sampled at t: interpolated, filtered as one block, datum and eta """
+        ssd = dict()
+        ssd['t'], Y = interp_cycle(t, X)
+        ssd['data_len'] = len(ssd['t'])
+        Y = sig.sosfiltfilt(drive_cycle_filt, Y, axis=-1)
+        for i, key in enumerate(dc_keys):
+                ssd[key] = Y[i]
+        ssd = set_datum(ssd, channels=['eta'])
+        return ssd
+
+# =======================================================================================================
+
+def set_datum(ssd, channels=()):
+        """Set the minimum values in data sets and add the derived channels (eta clamped at 0)"""
         datum = {}
         datum['u1'] = 0.2     # Most of the testcell data shows this
         datum['u2'] = 0.1
         datum['F'] = 3     # From all the test cell data
         datum['y1'] = 0
         keys = ['y1', 'u1', 'u2', 'F']
-        for key in keys:
-                ssd[key] = np.array([val if val >= datum[key] else datum[key] for val in ssd[key]])
+        ssd = dch.derive_channels(ssd, datum, keys, channels, clamp=True)
         return ssd
 
 # ======================================================================================================================
 
-def load_truck_data_drive_cycles(gap :int = 60):
-    # Load the test Data
+def load_truck_data_drive_cycles(gap :int = 60, workers: int | None = 1, capture_errors: bool = False):
+    # Load the test Data, workers > 1 (or None for all cores) loads the trucks in parallel
     ag_tsts = [4, 4]
-    drive_cycle_data = [[DriveCycle(age, tst, gap) for tst in range(ag_tsts[age])] for age in range(2)]
+    drive_cycle_data = pl.load_nested(DriveCycle, ag_tsts, extra_args=(gap,), workers=workers,
+                                      capture_errors=capture_errors)
     return drive_cycle_data
 
 
@@ -1,7 +1,11 @@
 import numpy as np
+from DataProcessing import segments as sg
+from DataProcessing import batch_filtering as bf
 from DataProcessing.TruckData import rdRawDat as rd
 from DataProcessing.TruckData import sosFiltering as sf
-from DataProcessing.TruckData import etaCalc
+from DataProcessing import row_cleaning as rc
+from DataProcessing import derived_channels as dch
+from DataProcessing import pyramid as pm
 
 # Array Manipulating functions ------------------------------------------------------
 #==============================================================================================
@@ -9,75 +13,51 @@ def find_discontinuities(t, dt):
     """Find the discontinuities in the time Data
     The slices would be: [ [t_skips[0], t_skips[1]], [t_skips[1], t_skips[2]],... [t_skips[n-1], t_skips[n]] ]
     """
-    t_skips = np.array([i for i in range(1, len(t))
-                        if t[i] - t[i - 1] > 3 * dt], dtype=int)
-    t_skips = np.append(t_skips, len(t))            # Included the len(t) to follow the slicing rule of open interval
-    t_skips = np.insert(t_skips, 0, 0)
-    return t_skips
-
-
-# =============================================================================================
-def rmNaNrows(x):
-    """Remove the rows with NaN values"""
-    return np.delete(x,
-                     [i for i in range(len(x))
-                         if np.any(np.isnan(x[i]))],
-                     axis=0)
-
-# =============================================================================================
-def rmLowTemprows(x):
-    """Remove the rows with temperature less than T0.
-        The commercial NOx sensor does not work bellow this temperature.
-    """
-    Tmin = 0   # 200 deg-C
-    Tmax = 10   # 300 deg-C
-    return np.delete(x,
-                     [i for i in range(len(x))
-                         if (x[i, 4]<Tmin or x[i, 4]>Tmax)],
-                     axis=0)
+    # The offsets include 0 and len(t) to follow the slicing rule of open interval
+    return sg.find_segments(t, 3 * dt).offsets
+
+
+# Temperature window of the rows kept, the commercial NOx sensor does not work outside it
+T_window = (0, 10)      # 200 - 300 deg-C
 
 #===============================================================================================
 class FilteredTruckData():
     """Class of filtered test data both ssd and iod"""
     #===========================================================================================
-    def __init__(self, age: int, test_type: int):
+    def __init__(self, age: int, test_type: int, filt_workers: int | None = 1):
         self.rawData = rd.RawTruckData(age, test_type)
         self.dt = self.rawData.dt
         self.name = self.rawData.name
+        self.filt_workers = filt_workers     # Threads filtering the segments, None for all cores
         self.iod = self.gen_iod()
+        self.pyramids = {}
 
     # ===========================================================================================
     def gen_iod(self) -> dict[str, np.ndarray]:
         # Generate the input output Data
-        raw_tab = np.matrix([self.rawData.raw['t'],
-                             self.rawData.raw['y1'],
-                             self.rawData.raw['u1'],
-                             self.rawData.raw['u2'],
-                             self.rawData.raw['T'],
-                             self.rawData.raw['F']]).T
-        iod_tab = rmLowTemprows(rmNaNrows(raw_tab))
-        iod_mat = iod_tab.T
-        iod = {}
-        iod['t'] = np.array(iod_mat[0]).flatten()
-        iod['y1'] = np.array(iod_mat[1]).flatten()
-        iod['u1'] = np.array(iod_mat[2]).flatten()
-        iod['u2'] = np.array(iod_mat[3]).flatten()
-        iod['T'] = np.array(iod_mat[4]).flatten()
-        iod['F'] = np.array(iod_mat[5]).flatten()
+        iod = rc.clean_rows(self.rawData.raw, ['t', 'y1', 'u1', 'u2', 'T', 'F'], T_bounds=T_window)
         # Find the time discontinuities in IOD Data
         iod['t_skips'] = find_discontinuities(iod['t'], self.dt)
+        iod['segments'] = sg.SegmentIndex(iod['t_skips'])
         # Smooth all the data
-        for state in ['y1', 'u1', 'u2', 'T', 'F']:
-            iod[state]= sf.sosff_TD(iod['t_skips'], iod[state])
+        states = ['y1', 'u1', 'u2', 'T', 'F']
+        X = sf.sosff_TD_batch(iod['segments'], bf.stack_channels(iod, states), workers=self.filt_workers)
+        iod.update(bf.unstack_channels(X, states))
         # Set datum for the data
-        iod = self.set_datum(iod, type='iod')
-        # Calculate eta
-        iod['eta'] = etaCalc.calc_eta_TD(iod['y1'], iod['u1'], iod['t_skips'])
+        iod = self.set_datum(iod, type='iod', channels=['eta'])
         return iod
 
+    # ===========================================================================================
+    def pyramid(self, dt_levels: tuple = pm.dt_levels) -> pm.SignalPyramid:
+        """ Multi-resolution levels (1 Hz, 0.2 Hz, 0.05 Hz by default) of the iod, built on first use and kept """
+        dt_levels = tuple(dt_levels)
+        if dt_levels not in self.pyramids:
+            self.pyramids[dt_levels] = pm.SignalPyramid(self.iod, dt_levels=dt_levels, gap=3, clamp=True).build()
+        return self.pyramids[dt_levels]
+
     #===================================================================================================================
-    def set_datum(self, ssd, type='ssd'):
-        """Set the minimum values in data sets"""
+    def set_datum(self, ssd, type='ssd', channels=()):
+        """Set the minimum values in data sets and add the derived channels (eta clamped at 0)"""
         datum = {}
         datum['x1'] = 0
         datum['x2'] = 0
@@ -93,8 +73,7 @@ class FilteredTruckData():
             key_set = iod_keys
         else:
             raise ValueError("type must be 'ssd' or 'iod'")
-        for key in key_set:
-            ssd[key] = np.array([val if val >= datum[key] else datum[key] for val in ssd[key]])
+        ssd = dch.derive_channels(ssd, datum, key_set, channels, clamp=True)
         return ssd
 
 
@@ -1,13 +1,13 @@
 import matplotlib.pyplot as plt
+from DataProcessing import segments as sg
 
 def plot_TD(gca, x, y, t_skips, label='none', line_style='-', line_color="tab:orange"):
     """Plots with time skips"""
-    for i in range(len(t_skips)-1):
+    for i, seg in enumerate(sg.as_segments(t_skips).slices()):
         if i == 0:
-            gca.plot(x[t_skips[i]:t_skips[i+1]], y[t_skips[i]:t_skips[i+1]], line_style, label=label, linewidth=1, color=line_color)
+            gca.plot(x[seg], y[seg], line_style, label=label, linewidth=1, color=line_color)
         else:
-            gca.plot(x[t_skips[i]:t_skips[i + 1]], y[t_skips[i]:t_skips[i + 1]], line_style, linewidth=1,
-                     color=line_color)
+            gca.plot(x[seg], y[seg], line_style, linewidth=1, color=line_color)
 
 #======================
 tab_lines = iter(["tab:blue", "tab:orange", "tab:green", "tab:red", "tab:pink", "tab:olive", "tab:cyan", "tab:purple", "tab:brown"])
@@ -1,5 +1,6 @@
 import numpy as np
 from scipy.signal import welch
+from DataProcessing import segments as sg
 
 def welch_psd(y, fs):
     """Wrapper around scipy.signal.welch
@@ -24,12 +25,12 @@ def welch_psd(y, fs):
 def welch_TD(y, t_skips, fs):
     """ Welch PSD with time-discontinuities
     """
-    n = len(t_skips)-1
+    segs = sg.as_segments(t_skips)
     psd = list()
     f = list()
-    for i in range(n):
-        if len(y[t_skips[i]:t_skips[i+1]]) > 0:
-            f_i, psd_i = welch_psd(y[t_skips[i]:t_skips[i+1]], fs)
+    for y_seg in segs.views(y):
+        if len(y_seg) > 0:
+            f_i, psd_i = welch_psd(y_seg, fs)
             f.append(f_i)
             psd.append(psd_i)
     f = np.array(f).flatten()
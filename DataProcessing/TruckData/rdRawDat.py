@@ -1,8 +1,11 @@
 import numpy as np
 from scipy.io import loadmat
-import pathlib as pth
-import pickle as pkl
 from DataProcessing.TruckData import unit_convs as uc
+from DataProcessing import array_store as ast
+from DataProcessing import parallel_load as pl
+
+# The only variables of the day files that are used
+mat_vars = ['pSCRBedTemp', 'tod', 'pExhMF', 'pUreaDosing', 'pNOxInppm', 'pNOxOutppm']
 
 
 class RawTruckData():
@@ -12,11 +15,17 @@ class RawTruckData():
         self.dt = 1
         self .name = self.truck_name(age, trk)
         self.dat_file = self.data_dire()
+        self.raw = self.load_raw()
+    # ======================================================================
+
+    def load_raw(self):
+        """ Opens the converted channels from the array store, rebuilding it from the .mat file if needed """
         try:
-            self.raw = self.load_pickle()
+            raw = self.load_store()
         except FileNotFoundError:
-            self.raw = self.load_truck_data()
-            self.pickle_data()
+            raw = self.load_truck_data()
+            ast.save_arrays(self.store_dir(), raw, self.dat_file, uc.conv_version, digest=True)
+        return raw
     # ======================================================================
 
     def truck_name(self, age: int, trk: int) -> str:
@@ -83,45 +92,58 @@ class RawTruckData():
 
     def load_truck_data(self):
         # Load the truck Data
-        data = loadmat(self.dat_file)
+        data = loadmat(self.dat_file, variable_names=mat_vars)
         raw = dict()
         # Assigning the Data to the variables
         Tscr = np.array(data['pSCRBedTemp']).flatten() # 'V_ATP_TRC_SCR_T1'
         raw['t'] = np.array(data['tod']).flatten()
-        raw['F'] = uc.uConv(np.array(data['pExhMF']).flatten(), Tscr=Tscr, conv_type="g/s to [x 10 g/s]")                                     # g/sec
+        raw['F'] = uc.uConv(np.array(data['pExhMF'], dtype=np.float64).flatten(), Tscr=Tscr, conv_type="g/s to [x 10 g/s]", in_place=True)                                     # g/sec
         raw['T'] = uc.uConv(Tscr, Tscr=Tscr, conv_type="deg-C to [x 10 + 200 deg C]")
-        raw['u2'] = uc.uConv(np.array(data['pUreaDosing']).flatten(), Tscr=Tscr, conv_type="ml/s to [x 10^-1 ml/s]")
-        raw['u1'] = uc.uConv(np.array(data['pNOxInppm']).flatten(), Tscr=Tscr, conv_type="ppm to [x 10^-3 mol/m^3]")
-        raw['y1'] = uc.uConv(np.array(data['pNOxOutppm']).flatten(),Tscr=Tscr, conv_type="ppm to [x 10^-3 mol/m^3]")
+        raw['u2'] = uc.uConv(np.array(data['pUreaDosing'], dtype=np.float64).flatten(), Tscr=Tscr, conv_type="ml/s to [x 10^-1 ml/s]", in_place=True)
+        raw['u1'] = uc.uConv(np.array(data['pNOxInppm'], dtype=np.float64).flatten(), Tscr=Tscr, conv_type="ppm to [x 10^-3 mol/m^3]", in_place=True)
+        raw['y1'] = uc.uConv(np.array(data['pNOxOutppm'], dtype=np.float64).flatten(),Tscr=Tscr, conv_type="ppm to [x 10^-3 mol/m^3]", in_place=True)
         if self.name == "mes_18":
             for key in raw.keys():
                 raw[key] = raw[key][248:]
         return raw
     # ====================================================================================================
 
-    def pickle_data(self):
-        # Create a dictionary of the Data
-        # Pickle the data_dict to files
-        pkl_file = pth.Path("./DataProcessing/TruckData/pkl_files/" + self.name + ".pkl")
-        pkl_file.parent.mkdir(parents=True, exist_ok=True)
-        with pkl_file.open("wb") as f:
-            pkl.dump(self.raw, f)
+    def store_dir(self) -> str:
+        """ Returns the directory of the converted-array store of this truck """
+        return "./DataProcessing/TruckData/npy_files/" + self.name
     # ===============================================================
 
-    def load_pickle(self):
-        # Load the pickled Data
-        pkl_file = pth.Path("./DataProcessing/TruckData/pkl_files/" + self.name + ".pkl")
-        with pkl_file.open("rb") as f:
-            raw = pkl.load(f)
-        return raw
+    def load_store(self):
+        """ Opens the stored channels memory-mapped, raises FileNotFoundError if missing or stale """
+        return ast.load_arrays(self.store_dir(), self.dat_file, uc.conv_version)
     # =================================================================
 
+class RawTruckDay(RawTruckData):
+    """ Raw data of one day file of the multi-day trucks """
+    def __init__(self, day_name: str, dat_file: str = None):
+        """ Reads the day file (dat_file, or the file listed for day_name) and stores in a .raw dictionary """
+        self.dt = 1
+        self.name = day_name
+        self.dat_file = self.data_dire() if dat_file is None else dat_file
+        self.raw = self.load_raw()
+
+# ======================================================================================================================
+
+# Day files of the trucks that have several days of data, these are processed one day at a time
+multi_day_trucks = {"adt_17": ["adt_17_1", "adt_17_2", "adt_17_3"],
+                    "mes_18": ["mes_18_1", "mes_18_2", "mes_18_3", "mes_18_4", "mes_18_5",
+                               "mes_18_6", "mes_18_7", "mes_18_8", "mes_18_9"],
+                    "wer_17": ["wer_17_1", "wer_17_2", "wer_17_3"],
+                    "trw_16": ["trw_16_1", "trw_16_2", "trw_16_3"],
+                    "jnr_16": ["jnr_16_1", "jnr_16_2", "jnr_16_3", "jnr_16_4", "jnr_16_5"],
+                    "wal_16": ["wal_16_1", "wal_16_2", "wal_16_3", "wal_16_4", "wal_16_5"]}
+
 # ======================================================================================================================
 
-def load_truck_data_set():
-    """ Loads the entire truck data set """
+def load_truck_data_set(workers: int | None = 1, capture_errors: bool = False):
+    """ Loads the entire truck data set, workers > 1 (or None for all cores) loads the trucks in parallel """
     ag_trk = [4, 4]
-    truck_data = [[RawTruckData(age, trk) for trk in range(ag_trk[age])] for age in range(2)]
+    truck_data = pl.load_nested(RawTruckData, ag_trk, workers=workers, capture_errors=capture_errors)
     return truck_data
 
 # ======================================================================================================================
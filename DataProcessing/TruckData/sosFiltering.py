@@ -1,19 +1,20 @@
 import numpy as np
 import  scipy.signal as sig
+from DataProcessing import segments as sg
+from DataProcessing import batch_filtering as bf
 
 fs = 1
 lp_filt = sig.cheby2(7,40,  0.15, 'lowpass', analog=False, fs=1, output='sos')
 
 def sosff_TD(tskips, x: np.ndarray) -> np.ndarray:
-    """Filter the data with time jumps"""
-    pad_len = 24
-    y = np.zeros(np.shape(x))
-    for i in range(1, len(tskips)):
-        if len(x[tskips[i-1]:tskips[i]]) > pad_len:
-            y[tskips[i-1]:tskips[i]] = sig.sosfiltfilt(lp_filt, x[tskips[i-1]:tskips[i]])
-        else:
-            y[tskips[i - 1]:tskips[i]] = x[tskips[i - 1]:tskips[i]]
-    return y
+    """Filter the data with time jumps, tskips is a SegmentIndex or the t_skips offsets"""
+    return sosff_TD_batch(tskips, np.atleast_2d(x))[0]
+
+def sosff_TD_batch(tskips, X: np.ndarray, workers: int | None = 1) -> np.ndarray:
+    """Filter the rows (channels) of X together, one sosfiltfilt call per segment
+    workers > 1 (or None for all cores) filters the segments in a thread pool
+    """
+    return bf.sosfiltfilt_segments(lp_filt, sg.as_segments(tskips), X, pad_len=24, workers=workers)
 
 # ==============================================================================================
 
@@ -21,6 +22,50 @@ drive_cycle_filt = sig.cheby2(7,40,  0.1, 'lowpass', analog=False, fs=1, output=
 
 # ===========================================================================================
 
+class StreamingFilter():
+    """Causal (online) version of the filters for live telemetry
+    Takes the samples chunk by chunk and keeps the filter state between chunks, so every sample is filtered as
+    soon as it arrives. The output lags the input by the group delay of the filter (delay, in samples) instead
+    of being zero-phase. The state restarts on the first sample after a time gap larger than max_step, like
+    the segments of sosff_TD, also when the gap falls between two chunks.
+    NaN rows should be dropped before the samples are passed in (row_cleaning.keep_mask).
+    """
+    def __init__(self, sos: np.ndarray = lp_filt, max_step: float = 3):
+        self.sos = sos
+        self.max_step = max_step        # Same as find_discontinuities of the filtered data (3*dt)
+        self.zi_step = sig.sosfilt_zi(sos)
+        w, gd = sig.group_delay(sig.sos2tf(sos), w=[1e-3], fs=fs)
+        self.delay = gd[0]
+        self.reset()
+
+    def reset(self):
+        """Forget the state, the next sample starts a new segment"""
+        self.zi = None
+        self.t_last = None
+
+    def process(self, t: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """Filters the chunk x sampled at t, x is one channel (n,) or a block of channels (channels x n)"""
+        t = np.asarray(t, dtype=np.float64)
+        X = np.atleast_2d(np.asarray(x, dtype=np.float64))
+        if len(t) == 0:
+            return np.reshape(X, np.shape(x))
+        # Segments of the chunk, a new one starts at every gap including the one to the previous chunk
+        starts = np.flatnonzero(np.diff(t) > self.max_step) + 1
+        if self.t_last is None or t[0] - self.t_last > self.max_step:
+            self.zi = None
+        bounds = np.concatenate(([0], starts, [len(t)]))
+        Y = np.empty(np.shape(X))
+        for i in range(len(bounds) - 1):
+            seg = slice(bounds[i], bounds[i+1])
+            if self.zi is None or i > 0:
+                # Start at the steady state of the first sample to avoid the step transient
+                self.zi = self.zi_step[:, None, :] * X[:, seg.start][None, :, None]
+            Y[:, seg], self.zi = sig.sosfilt(self.sos, X[:, seg], axis=-1, zi=self.zi)
+        self.t_last = t[-1]
+        return np.reshape(Y, np.shape(x))
+
+# ===========================================================================================
+
 if __name__ == "__main__":
     import matplotlib.pyplot as plt
     import matplotlib as mpl
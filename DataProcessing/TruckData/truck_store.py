@@ -0,0 +1,263 @@
+import re
+import json
+import shutil
+import datetime
+import pathlib as pth
+import numpy as np
+from DataProcessing.TruckData import rdRawDat as rd
+from DataProcessing.TruckData import unit_convs as uc
+from DataProcessing.TruckData import drive_cycles as dc
+from DataProcessing import row_cleaning as rc
+from DataProcessing import array_store as ast
+from DataProcessing import ragged as rg
+
+"""Incremental drive-cycle store of a multi-day truck.
+    Day files are ingested one at a time in time order. The samples of a day get an absolute time (tod plus the
+    day offset from the YYMMDD date of the file name), so a drive cycle can continue across midnight.
+    The store keeps:
+        chunk_###   the drive cycles closed by one ingest (ragged set), never touched again
+        tail_<day>  the cleaned samples of the last, still open, segment
+    A new day is only segmented together with the tail: every segment of tail + day except the last one is
+    closed, turned into drive cycles (interpolation, filtering, datum and eta) and written as a new chunk,
+    and the last segment becomes the new tail.
+    A chunk (or the tail) can hold samples of several days, when a segment runs across midnight. The index keeps
+    the manifest (path, size, mtime and sha256) of every day file it was built from. If one of them really
+    changed, the chunk is stale: it is dropped with every later chunk and the days are ingested again, starting
+    at the first sample (t0) that was still open when that chunk was made.
+"""
+
+cycle_keys = ['t'] + dc.dc_keys + ['eta']
+
+# ======================================================================================================================
+
+def day_offset(dat_file: str) -> float:
+    """ Seconds from 2000-01-01 to the start of the day in the YYMMDD date of the day file name """
+    match = re.search(r'_(\d{6})[^_/]*\.mat$', dat_file)
+    if match is None:
+        raise ValueError("No YYMMDD date in the day file name: " + dat_file)
+    yymmdd = match.group(1)
+    day = datetime.date(2000 + int(yymmdd[:2]), int(yymmdd[2:4]), int(yymmdd[4:]))
+    return float((day - datetime.date(2000, 1, 1)).days * 86400)
+
+# ======================================================================================================================
+
+class TruckStore():
+    """ Processed drive cycles of one truck, extended one day file at a time """
+    def __init__(self, trk_name: str, gap: int = 60, store_root: str = "./DataProcessing/TruckData/npy_files/"):
+        self.name = trk_name
+        self.gap = gap
+        self.dir = pth.Path(store_root) / (trk_name + "_cycles")
+        self.index_file = self.dir / "index.json"
+        if self.index_file.exists():
+            with self.index_file.open("r") as f:
+                self.index = json.load(f)
+            if self.index["gap"] != gap:
+                raise ValueError("The store was built with gap = " + str(self.index["gap"]))
+        else:
+            self.index = {"gap": gap, "days": [], "day_files": {}, "chunks": [], "tail": None}
+        self.chunks = [None] * len(self.index["chunks"])      # Opened lazily
+
+    # ==================================================================================================================
+
+    def save_index(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with self.index_file.open("w") as f:
+            json.dump(self.index, f, indent=1)
+
+    # ==================================================================================================================
+
+    def load_tail(self) -> dict[str, np.ndarray]:
+        """ Cleaned samples of the open segment (empty if there is none) """
+        tail = self.index["tail"]
+        if tail is None:
+            return {key: np.zeros(0) for key in ['t'] + dc.dc_keys}
+        return ast.load_arrays(self.dir / tail["dir"], tail["src"], uc.conv_version, mmap=False)
+
+    # ==================================================================================================================
+
+    def day_iod(self, day_name: str, dat_file: str = None) -> tuple[dict[str, np.ndarray], str]:
+        """ Cleaned samples of a day file with absolute time, as in DriveCycle.gen_iod """
+        raw_day = rd.RawTruckDay(day_name, dat_file)
+        iod = rc.clean_rows(raw_day.raw, ['t'] + dc.dc_keys, T_bounds=dc.T_window)
+        iod = dc.set_datum(iod)
+        iod['t'] = iod['t'] + day_offset(raw_day.dat_file)
+        return iod, raw_day.dat_file
+
+    # ==================================================================================================================
+
+    def day_sources(self, t_first: float, day_name: str, manifest: dict) -> dict[str, dict]:
+        """ Manifests of the stored days from the one holding t_first on, and of the day being ingested """
+        days = self.index["days"]
+        if t_first is None:
+            return {day_name: manifest}
+        offsets = [self.index["day_files"][day]["offset"] for day in days]
+        k = max(int(np.searchsorted(offsets, t_first, side='right')) - 1, 0)
+        sources = {day: dict(self.index["day_files"][day]["manifest"]) for day in days[k:]}
+        sources[day_name] = dict(manifest)
+        return sources
+
+    # ==================================================================================================================
+
+    def ingest(self, day_name: str, dat_file: str = None, t_min: float = None) -> int:
+        """ Appends a day file to the store and returns the number of drive cycles it closed
+            Only the open tail and the new day are segmented, the stored chunks are not touched.
+            Samples before t_min are skipped (re-ingesting a day whose start is already in the chunks).
+        """
+        if day_name in self.index["days"]:
+            raise ValueError(day_name + " is already in the store")
+        iod, src = self.day_iod(day_name, dat_file)
+        manifest = ast.source_manifest(src, uc.conv_version)
+        manifest["sha256"] = ast.file_digest(src)
+        if t_min is not None:
+            iod = {key: x[iod['t'] >= t_min] for key, x in iod.items()}
+        tail = self.load_tail()
+        if len(iod['t']) > 0 and len(tail['t']) > 0 and iod['t'][0] <= tail['t'][-1]:
+            raise ValueError(day_name + " starts before the end of the data in the store")
+        data = {key: np.concatenate((tail[key], iod[key])) for key in ['t'] + dc.dc_keys}
+        t0 = float(data['t'][0]) if len(data['t']) > 0 else None       # First sample that is still open
+        bounds = dc.find_drive_cycles(data['t'], gap=self.gap)
+        # Close every segment but the last one
+        cycle_args = []
+        for i_min, i_max in zip(bounds[:-2], bounds[1:-1]):
+            t_seg = data['t'][i_min:i_max]
+            if np.ceil(np.max(t_seg) - np.min(t_seg)) > 1200:       # Only drive cycles longer than 20 minutes
+                cycle_args.append((t_seg, np.stack([data[key][i_min:i_max] for key in dc.dc_keys])))
+        cycles = [dc.gen_drive_cycle(t_seg, X) for t_seg, X in cycle_args]
+        if len(cycles) > 0:
+            chunk = rg.RaggedCycles.from_cycles(cycles, cycle_keys, labels=[day_name] * len(cycles))
+            chunk_name = "chunk_{:03d}".format(len(self.index["chunks"]))
+            chunk.save(self.dir / chunk_name, src, uc.conv_version, digest=True)
+            self.index["chunks"].append({"dir": chunk_name, "day": day_name, "src": src, "n": len(cycles),
+                                         "t0": t0, "sources": self.day_sources(t0, day_name, manifest)})
+            self.chunks.append(chunk)
+        # The last segment stays open, the old tail is only dropped once the index points to the new one
+        i_tail = bounds[-2] if len(bounds) > 1 else 0
+        old_tail = self.index["tail"]
+        tail_name = "tail_" + day_name
+        ast.save_arrays(self.dir / tail_name, {key: data[key][i_tail:] for key in ['t'] + dc.dc_keys}, src,
+                        uc.conv_version, digest=True)
+        t0_tail = float(data['t'][i_tail]) if i_tail < len(data['t']) else None
+        self.index["tail"] = {"dir": tail_name, "day": day_name, "src": src, "t0": t0_tail,
+                              "sources": self.day_sources(t0_tail, day_name, manifest)}
+        self.index["days"].append(day_name)
+        self.index["day_files"][day_name] = {"src": src, "offset": day_offset(src), "manifest": manifest}
+        self.save_index()
+        if old_tail is not None and old_tail["dir"] != tail_name:
+            shutil.rmtree(self.dir / old_tail["dir"], ignore_errors=True)
+        return len(cycles)
+
+    # ==================================================================================================================
+
+    def rebuild(self, i_chunk: int = None) -> int:
+        """ Drops chunk i_chunk and every later chunk (only the tail if i_chunk is None) and ingests the days
+            again from the first sample that was open when it was made. Returns the number of closed cycles.
+        """
+        if i_chunk is None:
+            t0 = self.index["tail"]["t0"] if self.index["tail"] is not None else None
+            i_chunk = len(self.index["chunks"])
+        else:
+            t0 = self.index["chunks"][i_chunk]["t0"]
+        days = self.index["days"]
+        if t0 is None:
+            k = len(days) - 1 if i_chunk == len(self.index["chunks"]) else 0
+        else:
+            offsets = [self.index["day_files"][day]["offset"] for day in days]
+            k = max(int(np.searchsorted(offsets, t0, side='right')) - 1, 0)
+        redo = [(day, self.index["day_files"][day]["src"]) for day in days[k:]]
+        for entry in self.index["chunks"][i_chunk:]:
+            shutil.rmtree(self.dir / entry["dir"], ignore_errors=True)
+        if self.index["tail"] is not None:
+            shutil.rmtree(self.dir / self.index["tail"]["dir"], ignore_errors=True)
+        self.index["chunks"] = self.index["chunks"][:i_chunk]
+        self.chunks = self.chunks[:i_chunk]
+        self.index["tail"] = None
+        self.index["days"] = days[:k]
+        for day, _ in redo:
+            self.index["day_files"].pop(day, None)
+        self.save_index()
+        n = 0
+        for j, (day, src) in enumerate(redo):
+            n += self.ingest(day, src, t_min=t0 if j == 0 else None)
+        return n
+
+    # ==================================================================================================================
+
+    def sources_changed(self, entry: dict) -> bool:
+        """ True if a day file of a chunk (or the tail) changed, the mtime of a file that was only touched is
+            updated in the index
+        """
+        touched = False
+        for manifest in entry.get("sources", {}).values():
+            try:
+                touched |= ast.check_source(manifest, manifest["source"], uc.conv_version)
+            except ast.StaleStoreError:
+                return True
+        if touched:
+            self.save_index()
+        return False
+
+    # ==================================================================================================================
+
+    def verify(self):
+        """ Opens every chunk and the tail, rebuilding from the first one that is stale """
+        i = 0
+        while i < len(self.chunks):
+            try:
+                self.chunk(i)
+                stale = self.sources_changed(self.index["chunks"][i])
+            except ast.StaleStoreError:
+                stale = True
+            if stale:
+                self.rebuild(i)
+                continue
+            i += 1
+        if self.index["tail"] is None:
+            return
+        try:
+            self.load_tail()
+            stale = self.sources_changed(self.index["tail"])
+        except ast.StaleStoreError:
+            stale = True
+        if stale:
+            self.rebuild()
+
+    # ==================================================================================================================
+
+    def chunk(self, i: int) -> rg.RaggedCycles:
+        """ Drive cycles of chunk i, memory-mapped """
+        if self.chunks[i] is None:
+            entry = self.index["chunks"][i]
+            self.chunks[i] = rg.RaggedCycles.load(self.dir / entry["dir"], entry["src"], uc.conv_version)
+        return self.chunks[i]
+
+    # ==================================================================================================================
+
+    def cycles(self, include_tail: bool = True) -> rg.RaggedCycles:
+        """ All the drive cycles in one ragged set, longest first
+            include_tail also makes a drive cycle of the open tail (not stored, it may still grow).
+            Stale chunks are rebuilt first (verify).
+        """
+        self.verify()
+        parts = [self.chunk(i) for i in range(len(self.chunks))]
+        if include_tail:
+            tail = self.load_tail()
+            t = tail['t']
+            if len(t) > 0 and np.ceil(np.max(t) - np.min(t)) > 1200:
+                ssd = dc.gen_drive_cycle(t, np.stack([tail[key] for key in dc.dc_keys]))
+                parts.append(rg.RaggedCycles.from_cycles([ssd], cycle_keys, labels=[self.index["tail"]["day"]]))
+        if len(parts) == 0:
+            return rg.RaggedCycles.from_cycles([], cycle_keys)
+        return rg.RaggedCycles.concatenate(parts)
+
+# ======================================================================================================================
+
+def build_truck_store(trk_name: str, gap: int = 60) -> TruckStore:
+    """ Brings the store of a multi-day truck up to date with the day files listed in rdRawDat """
+    store = TruckStore(trk_name, gap)
+    store.verify()
+    for day_name in rd.multi_day_trucks[trk_name]:
+        if day_name not in store.index["days"]:
+            store.ingest(day_name)
+    return store
+
+# ======================================================================================================================
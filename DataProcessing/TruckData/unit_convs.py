@@ -1,4 +1,5 @@
 import numpy as np
+from DataProcessing import unit_conv_plans as ucp
 
 """The file contains the functions that do the appropriate unit conversions for the states and inputs from the experimental data"""
 """ Standard Units:
@@ -13,24 +14,23 @@ kgmin2gsec = 16.6667              # Conversion factor from kg/min to g/sec
 T0 = 200                               # Reference temperature in deg-C
 M_nox = 30.0061                        # Molecular weight of NOx in g/mol
 M_nh3 = 17.0305                        # Molecular weight of NH3 in g/mol
+conv_version = 1                       # Bump when a conversion changes, invalidates the stored raw data
 
-def uConv(x, Tscr, conv_type: str):
-    """Unit conversion for the states"""
+def uConv(x, Tscr, conv_type: str, in_place: bool = False, dtype=np.float64):
+    """Unit conversion for the states (whole arrays, see DataProcessing.unit_conv_plans)"""
     match conv_type:
         case "deg-C to [x 10 + 200 deg C]":
             # print("Setting reference temperature as x 10 + 200 deg-C")
-            return np.array([np.nan if np.isnan(xi) else (xi - T0)/10  for xi in x ])
+            return ucp.convert(x, Tscr, "deg-C to [x 10 + 200 deg C]", in_place, dtype)
         case "g/s to [x 10 g/s]":
             # print("Converting kg/min to g/s")
-            return np.array([np.nan if np.isnan(xi) else xi/10 for xi in x])
+            return ucp.convert(x, Tscr, "g/s to [x 10 g/s]", in_place, dtype)
         case "ppm to [x 10^-3 mol/m^3]":
             # print("converting ppm (mole fraction) to 10^{-3} mol/m^3")
-            return np.array([np.nan if (np.isnan(xi) or np.isnan(T_scr))
-                                        else (xi/(22.4*((273.15+T_scr)/(273.15))))
-                                            for (xi, T_scr) in zip(x, Tscr)])
+            return ucp.convert(x, Tscr, "ppm to [x 10^-3 mol/m^3]", in_place, dtype)
         case "ml/s to [x 10^-1 ml/s]":
             # print("Scaling urea-injection to 10^{-3} ml/s")
-            return np.array([np.nan if np.isnan(xi) else xi*10 for xi in x])
+            return ucp.convert(x, Tscr, "ml/s to [x 10^-1 ml/s]", in_place, dtype)
         case _: # Default
             raise ValueError("Unknown unit conversion")
 #===
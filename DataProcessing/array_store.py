@@ -0,0 +1,98 @@
+import json
+import hashlib
+import pathlib as pth
+import numpy as np
+
+"""Versioned on-disk store of named numpy arrays.
+    Every store is a directory with one .npy file per array and a manifest.json that records the source file
+    (path, size, mtime) and the unit-conversion version the arrays were made with. A store is only opened when
+    its manifest matches the current source, so stale caches get rebuilt automatically.
+    Stores saved with a digest also keep the sha256 of the source, so a file that was only touched (same size,
+    new mtime) is recognised as unchanged instead of being re-read.
+"""
+
+store_version = 1       # Bump when the on-disk layout changes
+
+class StaleStoreError(FileNotFoundError):
+    """ The store exists but was built from a different source or conversion version """
+    pass
+
+# ======================================================================================================================
+
+def source_manifest(src_file: str, conv_version: int) -> dict:
+    """ Returns the manifest describing the current state of the source file """
+    src = pth.Path(src_file)
+    st = src.stat()
+    return {"store_version": store_version,
+            "source": str(src.resolve()),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "conv_version": conv_version}
+
+# ======================================================================================================================
+
+def file_digest(src_file: str) -> str:
+    """ sha256 of the source file read in 1 MB blocks """
+    h = hashlib.sha256()
+    with open(src_file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# ======================================================================================================================
+
+def check_source(stored: dict, src_file: str, conv_version: int) -> bool:
+    """ Checks a manifest (source_manifest, with the sha256 if it was saved with a digest) against the source
+        Raises StaleStoreError if the source changed. Returns True if it was only touched (same size and sha256,
+        new mtime), stored then gets the new mtime.
+    """
+    current = source_manifest(src_file, conv_version)
+    plain = {key: x for key, x in stored.items() if key != "sha256"}
+    if plain == current:
+        return False
+    sha = stored.get("sha256")
+    if sha is None or {**plain, "mtime_ns": 0} != {**current, "mtime_ns": 0} or sha != file_digest(src_file):
+        raise StaleStoreError("Changed source: " + str(src_file))
+    stored["mtime_ns"] = current["mtime_ns"]
+    return True
+
+# ======================================================================================================================
+
+def save_arrays(store_dir: str, arrays: dict[str, np.ndarray], src_file: str, conv_version: int,
+                digest: bool = False):
+    """ Writes the arrays and then the manifest (a store without manifest is never opened) """
+    store = pth.Path(store_dir)
+    store.mkdir(parents=True, exist_ok=True)
+    manifest_file = store / "manifest.json"
+    manifest_file.unlink(missing_ok=True)
+    for key, x in arrays.items():
+        np.save(store / (key + ".npy"), np.ascontiguousarray(x))
+    manifest = source_manifest(src_file, conv_version)
+    manifest["keys"] = list(arrays.keys())
+    if digest:
+        manifest["sha256"] = file_digest(src_file)
+    with manifest_file.open("w") as f:
+        json.dump(manifest, f, indent=1)
+
+# ======================================================================================================================
+
+def load_arrays(store_dir: str, src_file: str, conv_version: int, mmap: bool = True) -> dict[str, np.ndarray]:
+    """ Opens the arrays of a store (memory-mapped, read-only by default)
+        Raises FileNotFoundError if there is no store and StaleStoreError if it is out of date.
+    """
+    store = pth.Path(store_dir)
+    with (store / "manifest.json").open("r") as f:
+        stored = json.load(f)
+    keys = stored.pop("keys")
+    try:
+        touched = check_source(stored, src_file, conv_version)
+    except StaleStoreError:
+        raise StaleStoreError("Stale array store: " + str(store)) from None
+    if touched:
+        # Remember the new mtime so the source is not hashed again
+        with (store / "manifest.json").open("w") as f:
+            json.dump({**stored, "keys": keys}, f, indent=1)
+    mmap_mode = 'r' if mmap else None
+    return {key: np.load(store / (key + ".npy"), mmap_mode=mmap_mode) for key in keys}
+
+# ======================================================================================================================
@@ -0,0 +1,113 @@
+import numpy as np
+import scipy.signal as sig
+from DataProcessing import segments as sg
+from DataProcessing import batch_filtering as bf
+
+"""Fused anti-alias filtering and downsampling of segmented data.
+    All the channels of a segment are low-pass filtered and downsampled together by one polyphase FIR
+    (resample_poly) call, and the time vector of the output is built with arithmetic on preallocated arrays.
+    The input rate is detected from the time stamps, so data sets logged faster than the nominal rate get the
+    right decimation factor without special cases.
+"""
+
+# ======================================================================================================================
+
+def detect_rate(t: np.ndarray) -> float:
+    """ Returns the sampling time of t (median step, which ignores the time jumps) """
+    if len(t) < 2:
+        raise ValueError("At least two samples are needed to detect the sampling rate")
+    return float(np.median(np.diff(t)))
+
+# ======================================================================================================================
+
+def decimation_factor(dt_in: float, dt_out: float) -> int:
+    """ Returns the integer factor taking sampling time dt_in to dt_out """
+    q = int(round(dt_out / dt_in))
+    if q < 1 or not np.isclose(q * dt_in, dt_out, rtol=1e-3):
+        raise ValueError("Sampling time {} is not an integer fraction of {}".format(dt_in, dt_out))
+    return q
+
+# ======================================================================================================================
+
+def decimated_segments(tskips, q: int) -> sg.SegmentIndex:
+    """ Returns the segments after downsampling by q, a segment of n samples keeps ceil(n/q) """
+    segs = sg.as_segments(tskips)
+    out_lengths = -(-segs.lengths // q)
+    return sg.SegmentIndex(np.concatenate(([0], np.cumsum(out_lengths))))
+
+# ======================================================================================================================
+
+def decimate_segments(tskips, X: np.ndarray, q: int) -> tuple[np.ndarray, sg.SegmentIndex]:
+    """ Low-pass filters and downsamples by q every segment of the rows (channels) of X
+        Returns the decimated block and its segments.
+    """
+    segs = sg.as_segments(tskips)
+    out_segs = decimated_segments(segs, q)
+    X = np.atleast_2d(X)
+    Y = np.empty((np.shape(X)[0], out_segs.data_len), dtype=np.float64)
+    if q == 1:
+        Y[:] = X
+        return Y, out_segs
+    for seg, out_seg, n in zip(segs.slices(), out_segs.slices(), segs.lengths):
+        if n > 1:
+            Y[:, out_seg] = sig.resample_poly(X[:, seg], up=1, down=q, axis=-1, padtype='line')
+        else:
+            Y[:, out_seg] = X[:, seg]       # The line padding needs two samples
+    return Y, out_segs
+
+# ======================================================================================================================
+
+def decimate_time(tskips, t: np.ndarray, q: int, dt_out: float) -> np.ndarray:
+    """ Returns the time of the downsampled segments: t0 + k dt_out for k < ceil(n/q) in every segment """
+    segs = sg.as_segments(tskips)
+    out_segs = decimated_segments(segs, q)
+    k = np.arange(out_segs.data_len, dtype=np.float64)
+    k -= np.repeat(out_segs.starts, out_segs.lengths)
+    k *= dt_out
+    full = segs.lengths > 0                 # Empty segments have no t0 (and no output samples)
+    k += np.repeat(np.asarray(t, dtype=np.float64)[segs.starts[full]], out_segs.lengths[full])
+    return k
+
+# ======================================================================================================================
+
+def decimate_data(data: dict[str, np.ndarray], keys: list[str], dt_out: float,
+                  dt_in: float = None) -> dict[str, np.ndarray]:
+    """ Decimates the channels in keys of a segmented data set (with 't' and 'segments') to sampling time dt_out
+        The input sampling time is detected from 't' unless dt_in is given.
+        Returns the decimated channels, 't' and the decimated 'segments'.
+    """
+    if dt_in is None:
+        dt_in = detect_rate(data['t'])
+    q = decimation_factor(dt_in, dt_out)
+    Y, out_segs = decimate_segments(data['segments'], bf.stack_channels(data, keys), q)
+    dec = bf.unstack_channels(Y, keys)
+    dec['t'] = decimate_time(data['segments'], data['t'], q, dt_out)
+    dec['segments'] = out_segs
+    return dec
+
+# ======================================================================================================================
+
+if __name__ == "__main__":
+    import time
+
+    # Benchmark: 8 channels of a 3 h test at 5 Hz in 20 segments, against the per-channel IIR decimation
+    rng = np.random.default_rng(0)
+    n = 5 * 3 * 3600
+    offsets = np.concatenate(([0], np.sort(rng.choice(np.arange(100, n - 100), 19, replace=False)), [n]))
+    segs = sg.SegmentIndex(offsets)
+    t = 0.2 * np.arange(n) + 10 * np.repeat(np.arange(segs.n), segs.lengths)
+    X = np.cumsum(rng.standard_normal((8, n)), axis=-1)
+
+    t0 = time.perf_counter()
+    y_iir = [np.concatenate([sig.decimate(x_seg, 5, n=7, ftype='iir', zero_phase=True) for x_seg in segs.views(x)])
+             for x in X]
+    t_iir = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    dec = decimate_data({'t': t, 'segments': segs, **{str(i): X[i] for i in range(8)}}, [str(i) for i in range(8)], 1)
+    t_fused = time.perf_counter() - t0
+
+    print("8 channels x {} samples in {} segments".format(n, segs.n))
+    print("  per channel IIR decimate : {:8.4f} s".format(t_iir))
+    print("  fused polyphase          : {:8.4f} s  ({:.1f}x)".format(t_fused, t_iir / t_fused))
+    print("  same output length       :", len(dec['t']) == len(y_iir[0]))
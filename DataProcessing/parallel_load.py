@@ -0,0 +1,57 @@
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+"""Loading of independent data sets (tests, trucks, simulations) in a process pool.
+    The results always come back in the order of the argument list, whatever order the workers finish in.
+"""
+
+class LoadFailure():
+    """ Takes the place of an item that could not be loaded and keeps the error """
+    def __init__(self, args: tuple, exc: Exception):
+        self.args = args
+        self.error = repr(exc)
+        self.traceback = traceback.format_exc()
+
+    def __repr__(self):
+        return "LoadFailure" + str(self.args) + ": " + self.error
+
+# ======================================================================================================================
+
+def _load_item(factory, args: tuple, capture_errors: bool):
+    """ Loads one item in the worker, turning errors into LoadFailure if asked to """
+    try:
+        return factory(*args)
+    except Exception as exc:
+        if not capture_errors:
+            raise
+        return LoadFailure(args, exc)
+
+# ======================================================================================================================
+
+def load_parallel(factory, arg_list: list[tuple], workers: int | None = 1, capture_errors: bool = False) -> list:
+    """ Returns [factory(*args) for args in arg_list]
+        workers = 1 loads serially in this process, None uses one worker per core.
+        With capture_errors the failed items are LoadFailure objects instead of raising.
+    """
+    if workers == 1:
+        return [_load_item(factory, args, capture_errors) for args in arg_list]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_load_item, factory, args, capture_errors) for args in arg_list]
+        return [fut.result() for fut in futures]
+
+# ======================================================================================================================
+
+def load_nested(factory, ag_tsts: list[int], extra_args: tuple = (), workers: int | None = 1,
+                capture_errors: bool = False) -> list[list]:
+    """ Returns [[factory(age, tst, *extra_args) for tst in range(ag_tsts[age])] for age in range(len(ag_tsts))]
+        with all the items loaded in one pool.
+    """
+    arg_list = [(age, tst) + tuple(extra_args) for age in range(len(ag_tsts)) for tst in range(ag_tsts[age])]
+    flat = load_parallel(factory, arg_list, workers, capture_errors)
+    nested = []
+    for age in range(len(ag_tsts)):
+        nested.append(flat[:ag_tsts[age]])
+        flat = flat[ag_tsts[age]:]
+    return nested
+
+# ======================================================================================================================
@@ -0,0 +1,103 @@
+import numpy as np
+from DataProcessing import multirate as mr
+from DataProcessing import segments as sg
+from DataProcessing import derived_channels as dch
+
+"""Multi-resolution views of a segmented data set.
+    The levels are built as a cascade: the finest level is decimated from the filtered data and every coarser
+    level from the level above it, so the filtered data is read only once and each level costs a fraction of
+    the one before. The levels are kept once built, so exploratory work can start on a coarse level and drill
+    down to the finer ones without recomputing anything.
+    Every level is segmented again on its own time (as the 1 Hz views of the data sets are) and eta is recomputed
+    at the level rate, so it follows the one-step model of that level. The decimated eta is kept as 'eta_dec' and
+    is what the next level decimates.
+"""
+
+dt_levels = (1, 5, 20)      # Sampling times of the levels in s: 1 Hz, 0.2 Hz and 0.05 Hz
+
+# ======================================================================================================================
+
+class SignalPyramid():
+    """ Levels of a data set (dict with 't', 'segments' and the channels) at the sampling times dt_levels
+        keys selects the channels, by default all of them. A level is split where its samples are more than
+        gap * dt apart (the find_discontinuities rule of the data set) and clamp is the eta convention.
+    """
+    def __init__(self, data: dict[str, np.ndarray], keys: list[str] = None, dt_levels: tuple = dt_levels,
+                 gap: float = 1.5, clamp: bool = True):
+        if any(dt_c % dt_f != 0 for dt_f, dt_c in zip(dt_levels[:-1], dt_levels[1:])):
+            raise ValueError("Every level must be an integer multiple of the one before")
+        self.data = data
+        if keys is None:
+            keys = [key for key in data.keys() if key not in ['t', 't_skips', 'segments']]
+        self.keys = keys
+        self.dt_levels = tuple(dt_levels)
+        self.gap = gap
+        self.clamp = clamp
+        self.levels = {}
+
+    # ==================================================================================================================
+
+    def build(self):
+        """ Builds all the levels in one pass down the cascade """
+        self.level(self.dt_levels[-1])
+        return self
+
+    # ==================================================================================================================
+
+    def level(self, dt: float) -> dict[str, np.ndarray]:
+        """ Returns the level with sampling time dt, building it (and the finer ones it needs) on first use
+            The level has the channels in keys, 't', 'segments' and 't_skips' (and 'eta_dec' if eta is in keys).
+        """
+        if dt not in self.dt_levels:
+            raise KeyError("No level with sampling time " + str(dt))
+        i = self.dt_levels.index(dt)
+        if dt not in self.levels:
+            if i == 0:
+                dec = mr.decimate_data(self.data, self.keys, dt)
+            else:
+                finer = self.level(self.dt_levels[i-1])
+                if 'eta_dec' in finer:
+                    finer = {**finer, 'eta': finer['eta_dec']}
+                dec = mr.decimate_data(finer, self.keys, dt, dt_in=self.dt_levels[i-1])
+            dec['segments'] = sg.find_segments(dec['t'], self.gap * dt)
+            dec['t_skips'] = dec['segments'].offsets
+            if 'eta' in self.keys:
+                dec['eta_dec'] = dec['eta']
+                dec = dch.derive_channels(dec, channels=['eta'], clamp=self.clamp)
+            self.levels[dt] = dec
+        return self.levels[dt]
+
+    # ==================================================================================================================
+
+    def __getitem__(self, dt: float) -> dict[str, np.ndarray]:
+        return self.level(dt)
+
+    # ==================================================================================================================
+
+    def coarsest(self) -> dict[str, np.ndarray]:
+        """ Returns the level with the longest sampling time """
+        return self.level(self.dt_levels[-1])
+
+# ======================================================================================================================
+
+if __name__ == "__main__":
+    import time
+    from DataProcessing import segments as sg
+
+    # Cost of the levels of a synthetic 8-channel, 24 h, 5 Hz data set
+    rng = np.random.default_rng(0)
+    n = 5 * 24 * 3600
+    offsets = np.concatenate(([0], np.sort(rng.choice(np.arange(1000, n - 1000), 9, replace=False)), [n]))
+    segs = sg.SegmentIndex(offsets)
+    keys = [str(i) for i in range(8)]
+    data = {'t': 0.2 * np.arange(n) + 60 * np.repeat(np.arange(segs.n), segs.lengths), 'segments': segs}
+    data.update({key: np.cumsum(rng.standard_normal(n)) for key in keys})
+
+    pyr = SignalPyramid(data, keys)
+    for dt in pyr.dt_levels:
+        t0 = time.perf_counter()
+        lvl = pyr.level(dt)
+        print("  dt = {:3} s: {:7} samples, built in {:.4f} s".format(dt, len(lvl['t']), time.perf_counter() - t0))
+    t0 = time.perf_counter()
+    pyr.coarsest()
+    print("  cached access: {:.2e} s".format(time.perf_counter() - t0))
@@ -0,0 +1,102 @@
+import numpy as np
+from DataProcessing import segments as sg
+from DataProcessing import array_store as ast
+
+"""Ragged storage of many variable-length records (drive cycles).
+    Every channel is one contiguous buffer with all the records back to back, and a SegmentIndex of the
+    offsets gives each record as a zero-copy view. The records are kept sorted longest first (records of the same
+    length in the order they were given, so a set is the same however it was built). The buffers are
+    plain numpy arrays, so a whole fleet of cycles is a handful of arrays: cheap to pickle to worker processes
+    and saved/loaded (memory-mapped) with array_store.
+"""
+
+class RaggedCycles():
+    """ Records with the channels in keys, stored as one buffer per channel and the record offsets """
+    def __init__(self, buffers: dict[str, np.ndarray], offsets: np.ndarray, labels: np.ndarray = None):
+        self.buffers = buffers
+        self.keys = list(buffers.keys())
+        self.segments = sg.SegmentIndex(offsets)
+        self.lengths = self.segments.lengths
+        self.slices = self.segments.slices()
+        if labels is None:
+            labels = np.full(self.segments.n, "")
+        self.labels = np.asarray(labels, dtype=str)
+
+    # ==================================================================================================================
+
+    @classmethod
+    def from_cycles(cls, cycles: list[dict[str, np.ndarray]], keys: list[str], labels: list[str] = None):
+        """ Packs the records (dicts with the channels in keys) into one buffer per channel, longest first """
+        lens = np.array([len(cycle[keys[0]]) for cycle in cycles], dtype=int)
+        order = np.argsort(-lens, kind='stable')
+        offsets = np.concatenate(([0], np.cumsum(lens[order])))
+        buffers = {}
+        for key in keys:
+            buffers[key] = np.empty(offsets[-1], dtype=np.float64)
+            for k, i in enumerate(order):
+                buffers[key][offsets[k]:offsets[k+1]] = cycles[i][key]
+        if labels is not None:
+            labels = np.asarray(labels, dtype=str)[order]
+        return cls(buffers, offsets, labels)
+
+    # ==================================================================================================================
+
+    @classmethod
+    def concatenate(cls, parts: list['RaggedCycles']):
+        """ Joins several ragged sets (e.g. the days of a fleet), keeping them sorted longest first """
+        keys = parts[0].keys
+        lens = np.concatenate([part.lengths for part in parts])
+        order = np.argsort(-lens, kind='stable')
+        starts = np.concatenate([part.segments.starts + shift for part, shift in
+                                 zip(parts, np.cumsum([0] + [part.segments.data_len for part in parts[:-1]]))])
+        offsets = np.concatenate(([0], np.cumsum(lens[order])))
+        # Gather indices of the records in the new order
+        idx = np.repeat(starts[order] - offsets[:-1], lens[order]) + np.arange(offsets[-1])
+        buffers = {key: np.concatenate([part.buffers[key] for part in parts])[idx] for key in keys}
+        labels = np.concatenate([part.labels for part in parts])[order]
+        return cls(buffers, offsets, labels)
+
+    # ==================================================================================================================
+
+    def __len__(self):
+        return self.segments.n
+
+    # ==================================================================================================================
+
+    def __getitem__(self, i: int) -> dict[str, np.ndarray]:
+        """ Record i (0 is the longest) as views into the buffers, with its 'data_len' """
+        if not -len(self) <= i < len(self):
+            raise IndexError("Record index out of range")
+        seg = self.slices[i]
+        cycle = {key: self.buffers[key][seg] for key in self.keys}
+        cycle['data_len'] = int(self.lengths[i])
+        return cycle
+
+    # ==================================================================================================================
+
+    def as_dict(self) -> dict[str, dict[str, np.ndarray]]:
+        """ The records keyed by str(i), as in DriveCycle.drive_cycles """
+        return {str(i): self[i] for i in range(len(self))}
+
+    # ==================================================================================================================
+
+    def save(self, store_dir: str, src_file: str, conv_version: int, digest: bool = False):
+        """ Writes the buffers, offsets and labels as an array store tied to the source file
+            digest also records the sha256 of the source, so only touching the source does not make it stale.
+        """
+        arrays = dict(self.buffers)
+        arrays['offsets'] = self.segments.offsets
+        arrays['labels'] = self.labels
+        ast.save_arrays(store_dir, arrays, src_file, conv_version, digest=digest)
+
+    # ==================================================================================================================
+
+    @classmethod
+    def load(cls, store_dir: str, src_file: str, conv_version: int, mmap: bool = True):
+        """ Opens a saved ragged set, memory-mapped by default (raises FileNotFoundError if missing or stale) """
+        arrays = ast.load_arrays(store_dir, src_file, conv_version, mmap=mmap)
+        offsets = np.asarray(arrays.pop('offsets'))
+        labels = np.asarray(arrays.pop('labels'))
+        return cls(arrays, offsets, labels)
+
+# ======================================================================================================================
@@ -0,0 +1,39 @@
+import numpy as np
+
+"""Columnar row cleaning shared by the filt_data modules.
+    One boolean keep-mask is built in a single pass over the channels (NaN rows, temperature window and the
+    rows trimmed off the start) and then applied to each channel, which gives contiguous arrays without
+    going through an intermediate matrix.
+"""
+
+# ======================================================================================================================
+
+def keep_mask(channels: list[np.ndarray], T: np.ndarray = None, T_bounds: tuple = None, n_skip: int = 0) -> np.ndarray:
+    """ Returns the mask of the rows to keep:
+        after the first n_skip rows, no NaN in any of the channels and T inside [Tmin, Tmax] if T_bounds is given
+    """
+    n = len(channels[0])
+    drop = np.zeros(n, dtype=bool)
+    drop[:n_skip] = True
+    nan_rows = np.empty(n, dtype=bool)
+    for x in channels:
+        np.isnan(x, out=nan_rows)
+        np.logical_or(drop, nan_rows, out=drop)
+    if T_bounds is not None:
+        Tmin, Tmax = T_bounds
+        np.logical_or(drop, np.less(T, Tmin, out=nan_rows), out=drop)
+        np.logical_or(drop, np.greater(T, Tmax, out=nan_rows), out=drop)
+    return np.logical_not(drop, out=drop)
+
+# ======================================================================================================================
+
+def clean_rows(raw: dict[str, np.ndarray], keys: list[str], T_bounds: tuple = None,
+               n_skip: int = 0) -> dict[str, np.ndarray]:
+    """ Returns the channels in keys with the rows that fail keep_mask removed
+        The temperature window is checked on raw['T'].
+    """
+    T = raw['T'] if T_bounds is not None else None
+    mask = keep_mask([raw[key] for key in keys], T, T_bounds, n_skip)
+    return {key: np.asarray(raw[key])[mask] for key in keys}
+
+# ======================================================================================================================
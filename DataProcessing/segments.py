@@ -0,0 +1,76 @@
+import numpy as np
+
+"""Index of the contiguous segments of a time series.
+    The segmentation is computed once per data set with np.diff and handed to the time-discontinuity aware
+    stages (filtering, eta, decimation, PSD, plotting), which only walk the precomputed offsets.
+    The offsets follow the t_skips convention: segment i is the half-open slice [offsets[i], offsets[i+1]).
+"""
+
+class SegmentIndex():
+    """ Offsets, lengths and views of the segments of a time series """
+    def __init__(self, offsets):
+        """ Builds the index from the t_skips style offsets [0, ..., len(t)] """
+        self.offsets = np.asarray(offsets, dtype=int)
+        self.starts = self.offsets[:-1]
+        self.stops = self.offsets[1:]
+        self.lengths = np.diff(self.offsets)
+        self.n = len(self.lengths)
+        self.data_len = int(self.offsets[-1])
+
+    # ==================================================================================================================
+
+    def __len__(self):
+        return self.n
+
+    # ==================================================================================================================
+
+    def slices(self) -> list[slice]:
+        """ Returns the slice of every segment """
+        return [slice(a, b) for a, b in zip(self.starts.tolist(), self.stops.tolist())]
+
+    # ==================================================================================================================
+
+    def views(self, x: np.ndarray) -> list[np.ndarray]:
+        """ Returns the segments of x as views (no copies) """
+        return [x[sl] for sl in self.slices()]
+
+    # ==================================================================================================================
+
+    def segment_ids(self) -> np.ndarray:
+        """ Returns the segment number of every sample """
+        return np.repeat(np.arange(self.n), self.lengths)
+
+# ======================================================================================================================
+
+def find_segments(t: np.ndarray, max_step: float) -> SegmentIndex:
+    """ Splits t wherever consecutive samples are more than max_step apart """
+    breaks = np.flatnonzero(np.diff(t) > max_step) + 1
+    return SegmentIndex(np.concatenate(([0], breaks, [len(t)])))
+
+# ======================================================================================================================
+
+def sweep_segments(t: np.ndarray, max_steps: list[float]) -> dict[float, SegmentIndex]:
+    """ find_segments(t, max_step) for every max_step with a single np.diff
+        The breaks for a larger max_step are a subset of those for a smaller one, so only the first (smallest)
+        max_step scans the whole array and every next one filters the breaks of the one before.
+    """
+    steps = np.diff(t)
+    segmentations = {}
+    breaks = None
+    for max_step in sorted(max_steps):
+        if breaks is None:
+            breaks = np.flatnonzero(steps > max_step)
+        else:
+            breaks = breaks[steps[breaks] > max_step]
+        segmentations[max_step] = SegmentIndex(np.concatenate(([0], breaks + 1, [len(t)])))
+    return {max_step: segmentations[max_step] for max_step in max_steps}
+
+# ======================================================================================================================
+
+def as_segments(tskips) -> SegmentIndex:
+    """ Accepts either a SegmentIndex or t_skips offsets """
+    if isinstance(tskips, SegmentIndex):
+        return tskips
+    return SegmentIndex(tskips)
+
+# ======================================================================================================================
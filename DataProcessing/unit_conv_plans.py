@@ -0,0 +1,102 @@
+import numpy as np
+
+"""Vectorized unit conversions shared by the test-cell, simulation and truck readers.
+    Every conversion plan works on whole arrays with numpy ufuncs, optionally writing into the input array
+    (in_place) or producing float32 channels. NaN samples stay NaN.
+    Standard Units:
+    Temperature     : x 10 + 200 deg C
+    Mass flow rate  : x 10 g/s
+    Concentration   : x 10^-3 mol/m^3
+    urea_inj        : x 10^-1 ml/sec
+"""
+
+# Constants
+kgmin2gsec = 16.6667                   # Conversion factor from kg/min to g/sec
+T0 = 200                               # Reference temperature in deg-C
+T_stp = 273.15                         # Standard temperature in K
+V_stp = 22.4                           # Molar volume at standard conditions in l/mol
+
+# ======================================================================================================================
+
+def _T_offset(x, Tscr, out):
+    """ deg-C to [x 10 + 200 deg C] """
+    np.subtract(x, T0, out=out)
+    return np.divide(out, 10, out=out)
+
+def _kgmin_to_10gs(x, Tscr, out):
+    """ kg/min to [x 10 g/s] """
+    np.multiply(x, kgmin2gsec, out=out)
+    return np.divide(out, 10, out=out)
+
+def _gs_to_10gs(x, Tscr, out):
+    """ g/s to [x 10 g/s] """
+    return np.divide(x, 10, out=out)
+
+def _ppm_to_mol(x, Tscr, out):
+    """ ppm (mole fraction) to [x 10^-3 mol/m^3] at the SCR temperature """
+    molar_vol = np.add(T_stp, Tscr)
+    np.divide(molar_vol, T_stp, out=molar_vol)
+    np.multiply(V_stp, molar_vol, out=molar_vol)
+    return np.divide(x, molar_vol, out=out)
+
+def _mls_to_01mls(x, Tscr, out):
+    """ ml/s to [x 10^-1 ml/s] """
+    return np.multiply(x, 10, out=out)
+
+# Named conversion plans
+plans = {"deg-C to [x 10 + 200 deg C]": _T_offset,
+         "kg/min to [x 10 g/s]": _kgmin_to_10gs,
+         "g/s to [x 10 g/s]": _gs_to_10gs,
+         "ppm to [x 10^-3 mol/m^3]": _ppm_to_mol,
+         "ml/s to [x 10^-1 ml/s]": _mls_to_01mls}
+
+# ======================================================================================================================
+
+def convert(x, Tscr, plan: str, in_place: bool = False, dtype=np.float64) -> np.ndarray:
+    """ Applies the conversion plan to the whole array x
+        Tscr is the SCR temperature in deg-C (only used by the concentration plan).
+        in_place overwrites x (which then sets the dtype), otherwise a new array of dtype is returned.
+    """
+    if plan not in plans:
+        raise ValueError("Unknown unit conversion")
+    if in_place:
+        out = x
+    else:
+        x = np.asarray(x)
+        out = np.empty(np.shape(x), dtype=dtype)
+    return plans[plan](x, Tscr, out)
+
+# ======================================================================================================================
+
+if __name__ == "__main__":
+    import time
+
+    # Micro-benchmark against the per-sample list comprehensions on a 1e7-sample channel
+    N = 10**7
+    rng = np.random.default_rng(0)
+    x = 500 * rng.random(N)
+    Tscr = 200 + 100 * rng.random(N)
+
+    t0 = time.perf_counter()
+    y_loop = np.array([(xi/(22.4*((273.15+T_scr)/(273.15)))) for (xi, T_scr) in zip(x, Tscr)])
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    y_vec = convert(x, Tscr, "ppm to [x 10^-3 mol/m^3]")
+    t_vec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    y_32 = convert(x, Tscr, "ppm to [x 10^-3 mol/m^3]", dtype=np.float32)
+    t_32 = time.perf_counter() - t0
+
+    x_copy = x.copy()
+    t0 = time.perf_counter()
+    convert(x_copy, Tscr, "ppm to [x 10^-3 mol/m^3]", in_place=True)
+    t_in = time.perf_counter() - t0
+
+    print("ppm to mol/m^3 on {:.0e} samples".format(N))
+    print("  list comprehension : {:8.3f} s".format(t_loop))
+    print("  vectorized         : {:8.3f} s  ({:.0f}x)".format(t_vec, t_loop / t_vec))
+    print("  vectorized float32 : {:8.3f} s  ({:.0f}x)".format(t_32, t_loop / t_32))
+    print("  vectorized in place: {:8.3f} s  ({:.0f}x)".format(t_in, t_loop / t_in))
+    print("  identical results  :", np.array_equal(y_loop, y_vec) and np.array_equal(y_loop, x_copy))
@@ -3,6 +3,8 @@ import numpy as np
 import cvxpy as cp
 from scipy.optimize import lsq_linear, linprog
 from scipy.stats import gaussian_kde
+from SatSysID import regressors as rgs
+from SatSysID import lowdim_lp as lp
 
 # ===========================================
 
@@ -10,19 +12,18 @@ def PhiSat_mat(T, F, u1):
         """Returns the regression matrix for the given series or T, F and u1
            eta[k+1] = (u1[k]/F[k]) * [T**2 T 1] * [th1, th2 th3]^T
         """
-        N = len(T)
-        PhiSat = np.zeros([N, 3])
-        # Looping
-        for i in range(N):
-                PhiSat[i, :] = (u1[i]/F[i]) * np.array([T[i]**2, T[i], 1])
-        #===
-        return PhiSat
+        return rgs.PhiSat(T, F, u1)
 # ===============================================================================
 
-def solve_LP(eta, T, F, u1):
-        """ Solves the bounding linear programming problem for the given time-series data """
+def solve_LP(eta, T, F, u1, method='cvxpy'):
+        """ Solves the bounding linear programming problem for the given time-series data
+            method = 'cvxpy' or 'seidel' (the 3-variable LP engine of lowdim_lp)
+        """
         # Linear programming problem
         Phi_sat = PhiSat_mat(T, F, u1)
+        if method == 'seidel':
+                theta = lp.solve_sat_LP(Phi_sat[:-1, :], eta[1:], lo=[-np.inf, -np.inf, 0], hi=[0, np.inf, np.inf])
+                return np.matrix(theta).T
         eta_mat = np.matrix(eta).T
         theta = cp.Variable([3, 1])
         problem = cp.Problem(cp.Minimize(cp.sum(Phi_sat[:-1, :] @ theta)),
@@ -71,22 +72,14 @@ def Phi_alpha(T):
         """Returns the aging factor regression matrix for the given series or T, F and u1
            eta[k+1] = (u1[k]/F[k]) * [T**2 T 1] * [th1, th2 th3]^T
         """
-        N = len(T)
-        PhiSat = np.zeros([N, 3])
-        # Looping
-        for i in range(N):
-                PhiSat[i, :] = np.array([T[i]**2, T[i], 1])
-                # PhiSat[i, :] = np.array([T[i], 1, 0])
-        #===
-        return PhiSat
+        return rgs.Phi_alpha(T)
 
 # =============================================================================================
 
 def get_weights_from_kde(pdf, T, F, u1, eta):
         """ Returns the vector which would be the diagonal for the weight matrix for uniform sampling in the given temperature range"""
-        N = np.size(T)
-        w = np.array([1/(pdf([T[i], F[i], u1[i], eta[i]])) for i in range(N)])
-        return np.diag(w.flatten())
+        w = 1/pdf(np.vstack([np.ravel(T), np.ravel(F), np.ravel(u1), np.ravel(eta)]))
+        return w.flatten()
 # ===============================================================================================
 
 def T_filtered_indices(indices, T, T_min, T_max):
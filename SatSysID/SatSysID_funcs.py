@@ -1,13 +1,41 @@
 import numpy as np
 import cvxpy as cp
-from scipy.stats import halfnorm, goodness_of_fit, gaussian_kde
+from scipy.stats import halfnorm, goodness_of_fit
+from SatSysID import regressors as rgs
+from SatSysID import kde_weights as kw
+from SatSysID import sufficient_stats as ss
+from SatSysID import lowdim_lp as lp
+from SatSysID import envelope as env
 
 # ==============================================================================
 
-def solve_QP(Phi:np.ndarray, H:np.ndarray, W:np.ndarray, verbose=False):
-        """ Solve the quadratic programming problem with Phi and H """
-        P = 2 * Phi.T @ (W**2) @ Phi
-        q = 2 * (H.T @ (W**2) @ Phi).T
+def diag_weights(W:np.ndarray)->np.ndarray:
+        """ Returns the weights as a vector, W is the weight vector or (for old callers) the diagonal weight matrix """
+        W = np.asarray(W)
+        if W.ndim == 2 and W.shape[0] == W.shape[1] and W.shape[0] > 1:
+                return np.diag(W).copy()
+        return W.ravel()
+
+# ==============================================================================
+
+def solve_QP(Phi:np.ndarray, H:np.ndarray, W:np.ndarray, verbose=False, theta0:np.ndarray=None, stats=None, prune=False):
+        """ Solve the quadratic programming problem with Phi and H
+            W is the vector of weights (the diagonal of the weight matrix), the quadratic terms are the weighted
+            Gram products Phi^T diag(W^2) Phi and Phi^T diag(W^2) H, which need O(N) memory.
+            stats (SatStats of Phi, H, W) skips recomputing them, theta0 is a warm start for the solver.
+            prune solves with the upper-envelope rows of Phi theta >= H only, adding back any violated row (envelope).
+        """
+        Phi = np.asarray(Phi)
+        if stats is None:
+                stats = ss.SatStats.from_data(Phi, H, diag_weights(W))
+        P, q = stats.qp_terms()
+        if prune:
+                theta, _ = env.solve_pruned(lambda rows: QP_rows(P, q, Phi[rows], H[rows], verbose, theta0), Phi, H)
+                return theta
+        return QP_rows(P, q, Phi, H, verbose, theta0)
+
+def QP_rows(P:np.ndarray, q:np.ndarray, Phi:np.ndarray, H:np.ndarray, verbose=False, theta0:np.ndarray=None):
+        """ The QP of solve_QP with the objective terms P, q and the constraints of the given rows Phi, H """
         h = np.vstack([-H, np.zeros([3, 1])])
         parm_signs = np.eye(3)
         parm_signs[0, 0] = -1
@@ -18,6 +46,8 @@ def solve_QP(Phi:np.ndarray, H:np.ndarray, W:np.ndarray, verbose=False):
         objective = cp.Minimize( (1/2)*cp.quad_form(theta, P) - q.T @ theta )
         constraints = [G @ theta <= h]
         prob = cp.Problem(objective=objective, constraints=constraints)
+        if theta0 is not None:
+                theta.value = np.reshape(theta0, [3, 1])
         # Convex optimization problem
         # theta = cp.Variable([3, 1])
         # objective = cp.Minimize(cp.sum_squares(Phi@theta-H))
@@ -26,18 +56,32 @@ def solve_QP(Phi:np.ndarray, H:np.ndarray, W:np.ndarray, verbose=False):
         #                theta[1, 0] >= 0,
         #                theta[2, 0] >= 0]
         # prob = cp.Problem(objective=objective, constraints=constraints)
-        prob.solve(solver='MOSEK', verbose=verbose) #,
+        prob.solve(solver='MOSEK', verbose=verbose, warm_start=theta0 is not None) #,
         #===
         # Solution
         return theta.value
 
 # ==============================================================================
 
-def solve_LP(Phi:np.ndarray, H:np.ndarray, verbose=False):
-        """ Solve the quadratic programming problem with Phi and H """
+def solve_LP(Phi:np.ndarray, H:np.ndarray, verbose=False, method:str='mosek', prune=False):
+        """ Solve the quadratic programming problem with Phi and H
+            method = 'mosek' (cvxpy) or 'seidel' (the 3-variable LP engine of lowdim_lp, certificate checked)
+            prune solves with the upper-envelope rows of Phi theta >= H only, adding back any violated row (envelope).
+        """
+        Phi = np.asarray(Phi)
+        c = np.sum(Phi, axis=0)
+        if prune:
+                theta, _ = env.solve_pruned(lambda rows: LP_rows(c, Phi[rows], H[rows], verbose, method), Phi, H)
+                return theta
+        return LP_rows(c, Phi, H, verbose, method)
+
+def LP_rows(c:np.ndarray, Phi:np.ndarray, H:np.ndarray, verbose=False, method:str='mosek'):
+        """ The LP of solve_LP with the objective c^T theta (c = sum of all the rows) and the given rows Phi, H """
+        if method == 'seidel':
+                return lp.solve_sat_LP(Phi, H, c=c)
         # Convex optimization problem
         theta = cp.Variable([3, 1])
-        objective = cp.Minimize(cp.sum(Phi@theta))
+        objective = cp.Minimize(c @ theta)
         constraints = [Phi@theta >= H]
                 #        theta[0, 0] <= 0,
                 #        theta[1, 0] >= 0,
@@ -55,13 +99,7 @@ def PhiSat_mat(T, F, u1):
         """Returns the regression matrix for the given series or T, F and u1
            eta[k+1] = (u1[k]/F[k]) * [T**2 T 1] * [th1, th2 th3]^T
         """
-        N = len(T)
-        PhiSat = np.zeros([N, 3])
-        # Looping
-        for i in range(N):
-                PhiSat[i, :] = (u1[i]/F[i]) * np.array([T[i]**2, T[i], 1])
-        #===
-        return PhiSat
+        return rgs.PhiSat(T, F, u1)
 
 # ==============================================================================
 
@@ -88,10 +126,9 @@ def Fisher_Information(lmbd:float, Phi:np.ndarray)->np.ndarray:
 # ==============================================================================================
 
 
-def W_kde(eta:np.ndarray, u2:np.ndarray, T:np.ndarray, F:np.ndarray)->np.ndarray:
-        """ Returns the diagonal weight matrix square for uniform sampling in the given state/input range"""
-        pdf = gaussian_kde([eta, u2, T, F])
-        N = np.size(T)
-        w = np.array([1/(pdf([eta[i], u2[i], T[i], F[i]])) for i in range(N)])
-        w_norm = w/np.sum(w)
-        return np.diag(w_norm.flatten())
+def W_kde(eta:np.ndarray, u2:np.ndarray, T:np.ndarray, F:np.ndarray, method:str='exact', **kde_args)->np.ndarray:
+        """ Returns the weights (diagonal of the weight matrix) for uniform sampling in the given state/input range
+            method = 'exact', 'binned' or 'tree' (see kde_weights), the weights are cached per data set
+        """
+        X = np.vstack([np.ravel(eta), np.ravel(u2), np.ravel(T), np.ravel(F)])
+        return kw.kde_weights(X, method, **kde_args)
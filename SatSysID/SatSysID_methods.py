@@ -1,13 +1,20 @@
 import numpy as np
 import SatSysID_funcs as sf
+from SatSysID import regressors as rgs
+from SatSysID import sufficient_stats as ss
 
 class SatSys_ssd:
         """ The class that holds the data and methods for ssd SatSysID """
 
-        def __init__(self, ssd_data, name):
-                """ Initiates the class with ssd data """
+        def __init__(self, ssd_data, name, lp_method='mosek', prune=False):
+                """ Initiates the class with ssd data, lp_method = 'mosek' or 'seidel' for the saturation LP
+                    prune solves the LP and QP on the upper-envelope rows only (verified against all the rows)
+                """
                 self.ssd = ssd_data
                 self.name = name
+                self.lp_method = lp_method
+                self.prune = prune
+                self.regressors = rgs.RegressorCache(self.ssd)
                 # Calculating theta
                 self.theta_LP, self.idx = self.detect_sat()
                 self.theta_QP, self.theta_stats = self.get_theta_stats()
@@ -18,15 +25,16 @@ class SatSys_ssd:
                 """ Get the statistics of the paramter estimates by solving the quadratic programming problem """
                 # Getting the relavent data
                 eta = self.ssd['eta'][self.idx+1]
-                u1 = self.ssd['u1'][self.idx]
                 u2 = self.ssd['u2'][self.idx]
                 F = self.ssd["F"][self.idx]
                 T = self.ssd["T"][self.idx]
-                Phi = sf.PhiSat_mat(T, F, u1)
+                Phi = self.regressors.PhiSat()[self.idx]
                 H = np.matrix(eta).T
                 W = sf.W_kde(eta, u2, T, F)
-                # Solving the Quadratic Program
-                theta_QP = sf.solve_QP(Phi, H, W)
+                self.suff_stats = ss.SatStats.from_data(Phi, H, W)
+                # Solving the Quadratic Program, warm started from the unconstrained fit
+                theta_QP = sf.solve_QP(Phi, H, W, theta0=self.suff_stats.solve(), stats=self.suff_stats,
+                                       prune=self.prune)
                 # Calculating epsilon
                 eta_hat = (Phi @ theta_QP).flatten()
                 eps = (eta_hat - eta)
@@ -35,10 +43,9 @@ class SatSys_ssd:
                 hfn_lambda = sf.scale2lambda(hfn_fit.fit_result.params[1])
                 var_eps = hfn_fit.fit_result.params[1]**2 * (1 - 2/np.pi)
                 exp_eps = 1/hfn_lambda
-                I_theta = sf.Fisher_Information(hfn_lambda, Phi)
+                I_theta = self.suff_stats.fisher(hfn_lambda)
                 C_theta = np.linalg.inv(I_theta)
-                sigma_eta_sat = np.sqrt( np.array( [ (Phi[j,:]@ C_theta @ Phi[j,:].T)
-                                                        for j in range(np.shape(Phi)[0]-1) ] ))
+                sigma_eta_sat = np.sqrt(rgs.row_quad_forms(Phi[:-1, :], C_theta))
                 # Putting the caclulations into dictionary
                 theta_stats = dict()
                 theta_stats["eps"] = eps
@@ -58,9 +65,10 @@ class SatSys_ssd:
 
         def detect_sat(self):
                 """ Detect the saturated segments and return the LP solution and """
-                Phi = sf.PhiSat_mat(self.ssd['T'], self.ssd['F'], self.ssd['u1'])
+                Phi = self.regressors.PhiSat()
                 H = np.matrix(self.ssd['eta']).T
-                theta_LP = sf.solve_LP(Phi[0:-1,:], H[1:, :], verbose=False)
+                theta_LP = sf.solve_LP(Phi[0:-1,:], H[1:, :], verbose=False, method=self.lp_method,
+                                       prune=self.prune)
                 # Calculate the error
                 eta_hat = (Phi[0:-1, :] @ theta_LP).flatten()
                 eps_bimodal = (eta_hat - self.ssd['eta'][1:])
@@ -72,10 +80,9 @@ class SatSys_ssd:
         def predict_eta_sat(self, ssd_ref):
                 """ Predicts the response of this particular system to reference inputs ssd_ref"""
                 self.ssd_ref = ssd_ref
-                Phi_ref = sf.PhiSat_mat(self.ssd_ref['T'], self.ssd_ref['F'], self.ssd_ref['u1'])
+                Phi_ref = rgs.PhiSat(self.ssd_ref['T'], self.ssd_ref['F'], self.ssd_ref['u1'])
                 self.eta_pred = (Phi_ref[0:-1, :] @ self.theta_QP).flatten()
-                self.sigma_pred = np.sqrt( np.array( [ (Phi_ref[j,:] @ self.theta_stats['C_theta'] @ Phi_ref[j,:].T)
-                                                        for j in range(np.shape(Phi_ref)[0]-1) ] ))
+                self.sigma_pred = np.sqrt(rgs.row_quad_forms(Phi_ref[0:-1, :], self.theta_stats['C_theta']))
 
         # =================================================================================================
 
@@ -83,10 +90,9 @@ class SatSys_ssd:
                 """ Get the temperature variation of the Max. sigma """
                 N = 1000
                 self.T_lin = np.linspace(np.min(self.ssd['T']), np.max(self.ssd['T']), N)
-                Phi = np.matrix([np.array([Ti**2, Ti, 1]) for Ti in self.T_lin])
+                Phi = rgs.Phi_alpha(self.T_lin)
                 self.gamma_max = (Phi @ self.theta_QP).flatten()
-                self.sigma_gamma_max = np.sqrt( np.array( [ (Phi[j,:] @ self.theta_stats['C_theta'] @  Phi[j,:].T)[0,0]
-                                                        for j in range(N) ] ))
+                self.sigma_gamma_max = np.sqrt(rgs.row_quad_forms(Phi, self.theta_stats['C_theta']))
 
         # ===================================================================================================
 
@@ -0,0 +1,125 @@
+import numpy as np
+from scipy.spatial import ConvexHull, QhullError
+
+"""Pruning of the rows of Phi * theta >= H of the saturation LP and QP.
+        A row Phi[i, :] = s_i * [T_i**2 T_i 1] (s = u1/F > 0) is the condition g(T_i) >= r_i = H_i / s_i on the
+        quadratic g(T) = [T**2 T 1] * theta, so only the points (T_i, r_i) near the upper envelope can be active.
+        For a concave g (theta[0] <= 0, the sign constraint of solve_QP) the vertices of the upper convex hull of
+        the points are enough: g above them is above every chord of the hull. A convex g can touch points under
+        the hull, so the candidates also take the highest point of every T bin.
+        solve_pruned solves on the candidate rows, checks the solution against all the rows and adds the violated
+        ones back until none is left, so the result is that of the full problem. A subset of the rows can leave
+        the problem unbounded, then it is solved with all the rows.
+"""
+
+# ======================================================================================================================
+
+def upper_hull(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """ Indices of the vertices of the upper convex hull of the points (x, y) """
+        n = len(x)
+        if n < 3:
+                return np.arange(n)
+        pts = np.column_stack([x, y])
+        span = np.ptp(pts, axis=0)
+        pts = (pts - np.min(pts, axis=0)) / np.where(span > 0, span, 1)
+        try:
+                hull = ConvexHull(pts)
+        except QhullError:                                      # All the points on a line
+                return np.arange(n)
+        upper = hull.equations[:, 1] > 0                        # Outward normal pointing up
+        return np.unique(hull.simplices[upper])
+
+# ======================================================================================================================
+
+def bin_maxima(x: np.ndarray, y: np.ndarray, n_bins: int = 64) -> np.ndarray:
+        """ Index of the highest point in each of n_bins equal bins of x """
+        if len(x) == 0:
+                return np.zeros(0, dtype=int)
+        span = np.ptp(x)
+        bins = np.zeros(len(x), dtype=int) if span == 0 else \
+                np.minimum(((x - np.min(x)) / span * n_bins).astype(int), n_bins - 1)
+        order = np.lexsort((y, bins))
+        last = np.append(np.flatnonzero(np.diff(bins[order])), len(x) - 1)
+        return order[last]
+
+# ======================================================================================================================
+
+def candidate_rows(Phi: np.ndarray, H: np.ndarray, n_bins: int = 64) -> np.ndarray:
+        """ Rows of Phi * theta >= H that can be active: the upper hull and T-bin maxima of (T, H/s), and every
+            row with s <= 0 (these do not depend on theta)
+        """
+        Phi = np.asarray(Phi)
+        H = np.asarray(H).ravel()
+        s = Phi[:, 2]
+        pos = np.flatnonzero(s > 0)
+        T = Phi[pos, 1] / s[pos]
+        r = H[pos] / s[pos]
+        keep = np.union1d(upper_hull(T, r), bin_maxima(T, r, n_bins))
+        return np.union1d(np.flatnonzero(~(s > 0)), pos[keep])
+
+# ======================================================================================================================
+
+def violated_rows(Phi: np.ndarray, H: np.ndarray, theta: np.ndarray, tol: float = 1e-7) -> np.ndarray:
+        """ Rows with Phi * theta < H (relative to 1 + |H|) """
+        H = np.asarray(H).ravel()
+        return np.flatnonzero(np.asarray(Phi) @ np.ravel(theta) - H < -tol * (1 + np.abs(H)))
+
+# ======================================================================================================================
+
+def solve_pruned(solve, Phi: np.ndarray, H: np.ndarray, rows: np.ndarray = None, tol: float = 1e-7,
+                 max_iter: int = 20) -> tuple[np.ndarray, np.ndarray]:
+        """ Solves on a subset of the rows and adds the violated rows back until all are satisfied
+            solve(rows) returns theta of the problem with the constraints of the given rows only. If it fails on a
+            subset (returns None or raises ValueError, as lowdim_lp does for an unbounded LP) all the rows are used.
+            Returns theta and the rows of the last solve.
+        """
+        N = np.shape(Phi)[0]
+        rows = candidate_rows(Phi, H) if rows is None else np.asarray(rows)
+        for _ in range(max_iter):
+                if len(rows) == N:
+                        break
+                try:
+                        theta = solve(rows)
+                except ValueError:
+                        theta = None
+                if theta is None:
+                        break
+                viol = violated_rows(Phi, H, theta, tol)
+                if len(viol) == 0:
+                        return theta, rows
+                rows = np.union1d(rows, viol)
+        rows = np.arange(N)
+        return solve(rows), rows
+
+# ======================================================================================================================
+
+if __name__ == "__main__":
+        import time
+        from SatSysID import regressors as rgs
+        from SatSysID import lowdim_lp as lp
+
+        # Saturation LP of a synthetic week-long drive cycle, all rows against the pruned rows
+        rng = np.random.default_rng(0)
+        N = 7 * 86400
+        T, F, u1 = 4 + 3 * rng.beta(2, 3, N), 3 + 10 * rng.random(N), 5 * rng.random(N)
+        Phi = rgs.PhiSat(T, F, u1)
+        H = Phi @ np.array([-0.2, 2.0, 1.0]) - np.abs(rng.normal(0, 0.5, N))
+        c = np.sum(Phi, axis=0)
+
+        t0 = time.perf_counter()
+        theta_full = lp.solve_sat_LP(Phi, H)
+        t_full = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        rows = candidate_rows(Phi, H)
+        t_cand = time.perf_counter() - t0
+        n_cand = len(rows)
+        t0 = time.perf_counter()
+        theta_pr, rows = solve_pruned(lambda rows: lp.solve_sat_LP(Phi[rows], H[rows], c=c), Phi, H, rows)
+        t_pr = time.perf_counter() - t0
+
+        print("Saturation LP with {} rows".format(N))
+        print("  all rows            : {:8.4f} s".format(t_full))
+        print("  candidate rows      : {:8.4f} s  ({} rows)".format(t_cand, n_cand))
+        print("  pruned, verified    : {:8.4f} s  ({} rows at the end)".format(t_pr, len(rows)))
+        print("  objective rel. diff.:", abs(c @ (theta_pr - theta_full)).item() / abs(c @ theta_full).item())
@@ -0,0 +1,136 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from scipy.stats import gaussian_kde
+from scipy.spatial import cKDTree
+from scipy import ndimage
+from scipy.special import gamma
+
+"""Inverse-density weights of the samples of a data set (uniform sampling of the state/input range).
+        method = 'exact'  : gaussian_kde evaluated at all the samples in one batched call, O(N^2)
+        method = 'binned' : the samples are whitened, binned on a grid of `bins` cells per dimension and the
+                            histogram is smoothed with the same Gaussian kernel, O(N + bins^d). More bins is
+                            closer to 'exact'.
+        method = 'tree'   : k-nearest-neighbour density of the whitened samples with a KD-tree, O(N log N).
+                            Larger k is smoother.
+        The weights of the last cache_size data sets are cached by the hash of the samples (or a given key) and the
+        method settings, so fitting again on the same data skips the density evaluation.
+"""
+
+# ======================================================================================================================
+
+def _whiten(X: np.ndarray) -> tuple[np.ndarray, float]:
+        """ Returns the samples (d x N) with zero mean and identity covariance, and det of the whitening map """
+        L = np.linalg.cholesky(np.atleast_2d(np.cov(X)))
+        Z = np.linalg.solve(L, X - np.mean(X, axis=1, keepdims=True))
+        return Z, 1/np.prod(np.diag(L))
+
+# ======================================================================================================================
+
+def density_exact(X: np.ndarray) -> np.ndarray:
+        """ gaussian_kde of the samples evaluated at all of them at once """
+        return gaussian_kde(X)(X)
+
+# ======================================================================================================================
+
+def density_binned(X: np.ndarray, bins: int = 32) -> np.ndarray:
+        """ Gaussian KDE (Scott bandwidth) approximated on a grid of bins^d cells of the whitened samples """
+        d, N = np.shape(X)
+        Z, det_inv = _whiten(X)
+        bw = N**(-1/(d + 4))                    # Scott's factor, the kernel std in the whitened space
+        lo = np.min(Z, axis=1) - 3*bw
+        hi = np.max(Z, axis=1) + 3*bw
+        width = (hi - lo) / bins
+        counts, _ = np.histogramdd(Z.T, bins=bins, range=list(zip(lo, hi)))
+        dens = ndimage.gaussian_filter(counts, sigma=bw/width, mode='constant', truncate=3.0)
+        dens *= det_inv / (N * np.prod(width))
+        # Linear interpolation at the samples (cell centres are at index + 0.5)
+        coords = (Z - lo[:, np.newaxis]) / width[:, np.newaxis] - 0.5
+        return np.maximum(ndimage.map_coordinates(dens, coords, order=1, mode='nearest'), np.finfo(float).tiny)
+
+# ======================================================================================================================
+
+def density_tree(X: np.ndarray, k: int = 32) -> np.ndarray:
+        """ k-nearest-neighbour density of the whitened samples """
+        d, N = np.shape(X)
+        Z, det_inv = _whiten(X)
+        k = min(k, N - 1)
+        r, _ = cKDTree(Z.T).query(Z.T, k=k + 1, workers=-1)     # The nearest one is the sample itself
+        r_k = np.maximum(r[:, -1], np.finfo(float).tiny)
+        V_unit = np.pi**(d/2) / gamma(d/2 + 1)
+        return det_inv * k / (N * V_unit * r_k**d)
+
+# ======================================================================================================================
+
+cache_size = 8                          # Data sets whose weights are kept, least recently used dropped first
+_weights_cache = OrderedDict()
+
+def kde_weights(X: np.ndarray, method: str = 'exact', bins: int = 32, k: int = 32, cache: bool = True,
+                key=None) -> np.ndarray:
+        """ Normalized inverse-density weights of the samples X (d x N)
+            The cache is looked up by key, or by the sha1 of X if no key is given (O(N), small next to the density).
+            A new array is returned on every call, so callers may modify it.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        settings = {'exact': (), 'binned': (bins,), 'tree': (k,)}
+        if method not in settings:
+                raise ValueError("method must be 'exact', 'binned' or 'tree'")
+        if cache:
+                data_key = hashlib.sha1(X.tobytes()).hexdigest() if key is None else key
+                cache_key = (data_key, X.shape, method) + settings[method]
+                if cache_key in _weights_cache:
+                        _weights_cache.move_to_end(cache_key)
+                        return _weights_cache[cache_key].copy()
+        match method:
+                case 'exact':
+                        pdf = density_exact(X)
+                case 'binned':
+                        pdf = density_binned(X, bins)
+                case 'tree':
+                        pdf = density_tree(X, k)
+        w = 1/pdf
+        w /= np.sum(w)
+        if cache:
+                _weights_cache[cache_key] = w
+                while len(_weights_cache) > cache_size:
+                        _weights_cache.popitem(last=False)
+                return w.copy()
+        return w
+
+def clear_cache():
+        _weights_cache.clear()
+
+# ======================================================================================================================
+
+if __name__ == "__main__":
+        import time
+
+        # Weights of a synthetic 4-D data set (eta, u2, T, F) against the per-point evaluation of W_kde
+        rng = np.random.default_rng(0)
+        N = 4000
+        T = 4 + 3*rng.beta(2, 5, N)
+        F = 3 + 10*rng.random(N)
+        u2 = np.abs(rng.normal(1, 0.5, N))
+        eta = 0.5*T + 0.1*F + rng.normal(0, 0.3, N)
+        X = np.vstack([eta, u2, T, F])
+
+        t0 = time.perf_counter()
+        pdf = gaussian_kde(X)
+        w_loop = np.array([1/pdf(X[:, i]) for i in range(N)]).flatten()
+        w_loop /= np.sum(w_loop)
+        t_loop = time.perf_counter() - t0
+        print("W_kde weights of {} samples".format(N))
+        print("  per point loop      : {:8.4f} s".format(t_loop))
+        runs = [('exact', {}), ('binned', {'bins': 16}), ('binned', {'bins': 32}), ('tree', {'k': 16}),
+                ('tree', {'k': 64})]
+        for method, knob in runs:
+                t0 = time.perf_counter()
+                w = kde_weights(X, method, cache=False, **knob)
+                t_m = time.perf_counter() - t0
+                corr = np.corrcoef(np.log(w), np.log(w_loop))[0, 1]
+                print("  {:6} {:10}: {:8.4f} s  ({:5.0f}x)  max rel. diff {:.1e}  log corr {:.3f}".format(
+                        method, str(knob), t_m, t_loop/t_m, np.max(np.abs(w - w_loop)/w_loop), corr))
+        kde_weights(X, 'exact')
+        t0 = time.perf_counter()
+        kde_weights(X, 'exact')
+        print("  cached call         : {:8.4f} s".format(time.perf_counter() - t0))
@@ -0,0 +1,187 @@
+import numpy as np
+from scipy.optimize import nnls, linprog
+
+"""Linear programs with few variables and many constraints:  min c^T x  s.t.  A x >= b,  lo <= x <= hi.
+        The saturation LP (x = theta, A = Phi, b = H, c = sum of the rows of Phi) has 3 variables and one
+        constraint per sample. It is solved with Seidel's randomized incremental algorithm: the rows are taken in
+        a random order, and only a row violated by the current optimum triggers a solve of the lower-dimensional
+        LP on its boundary (the row eliminates one variable). The expected work is O(d! N). Every scan for the
+        next violated row is vectorized, so the Python work grows only with the number of violations (O(log N)).
+        The box lo <= x <= hi keeps every sub-problem bounded (+-bound where not given), a solution on that artificial
+        box, an infeasibility report or a failed certificate falls back to HiGHS (scipy linprog).
+        The solution is checked with a certificate: primal feasibility, and non-negative duals (nnls) of the
+        active rows and bounds that reproduce c.
+"""
+
+# ======================================================================================================================
+
+def _solve_1d(a: np.ndarray, b: np.ndarray, c: float, lo: float, hi: float, tol: float) -> float:
+        """ min c x  s.t.  a x >= b,  lo <= x <= hi """
+        pos = a > tol
+        neg = a < -tol
+        if np.any(~pos & ~neg & (b > tol * (1 + np.abs(b)))):
+                raise ValueError("The LP is infeasible")
+        x_lo = max(lo, np.max(b[pos] / a[pos], initial=-np.inf))
+        x_hi = min(hi, np.min(b[neg] / a[neg], initial=np.inf))
+        if x_lo > x_hi + tol * (1 + abs(x_hi)):
+                raise ValueError("The LP is infeasible")
+        return x_hi if c < 0 else x_lo
+
+# ======================================================================================================================
+
+def _seidel(A: np.ndarray, b: np.ndarray, c: np.ndarray, lo: np.ndarray, hi: np.ndarray, tol: float) -> np.ndarray:
+        """ Seidel's algorithm on the rows of A in the given order """
+        d = len(c)
+        if d == 1:
+                return np.array([_solve_1d(A[:, 0], b, c[0], lo[0], hi[0], tol)])
+        x = np.where(c < 0, hi, lo)             # Optimum of the box alone
+        slack_tol = tol * (1 + np.abs(b))
+        i = 0
+        while i < len(b):
+                viol = np.flatnonzero(A[i:] @ x < b[i:] - slack_tol[i:])
+                if len(viol) == 0:
+                        break
+                j = i + viol[0]
+                a_j = A[j]
+                k = np.argmax(np.abs(a_j))
+                if abs(a_j[k]) <= tol:
+                        raise ValueError("The LP is infeasible")
+                # On the boundary a_j x = b_j:  x_k = f + e x_r  (r = the other variables)
+                r = np.arange(d) != k
+                e = -a_j[r] / a_j[k]
+                f = b[j] / a_j[k]
+                # The box of x_k becomes two rows, they go first
+                A_r = np.vstack([e, -e, A[:j, r] + A[:j, k:k + 1] * e])
+                b_r = np.concatenate([[lo[k] - f, f - hi[k]], b[:j] - A[:j, k] * f])
+                keep = np.isfinite(b_r)
+                x_r = _seidel(A_r[keep], b_r[keep], c[r] + c[k] * e, lo[r], hi[r], tol)
+                x = np.empty(d)
+                x[r] = x_r
+                x[k] = f + e @ x_r
+                i = j + 1
+        return x
+
+# ======================================================================================================================
+
+def certificate(A: np.ndarray, b: np.ndarray, c: np.ndarray, x: np.ndarray, lo: np.ndarray, hi: np.ndarray,
+                tol: float = 1e-7) -> dict:
+        """ Optimality certificate of x:
+                max_violation : largest violation of A x >= b (relative to 1 + |b|)
+                dual_residual : || A_act^T y + z_lo - z_hi - c || / (1 + ||c||) with y, z >= 0 from nnls on the active
+                                rows and bounds
+                gap           : c^T x - (b_act^T y + lo_act^T z_lo - hi_act^T z_hi), relative to 1 + |c^T x|
+                ok            : all of the above within tol
+        """
+        slack = (A @ x - b) / (1 + np.abs(b))
+        act = np.flatnonzero(slack <= tol)
+        lo_f = np.where(np.isfinite(lo), lo, 0)
+        hi_f = np.where(np.isfinite(hi), hi, 0)
+        at_lo = np.flatnonzero(np.isfinite(lo) & (x <= lo_f + tol * (1 + np.abs(lo_f))))
+        at_hi = np.flatnonzero(np.isfinite(hi) & (x >= hi_f - tol * (1 + np.abs(hi_f))))
+        d = len(c)
+        M = np.vstack([A[act], np.eye(d)[at_lo], -np.eye(d)[at_hi]])
+        rhs = np.concatenate([b[act], lo_f[at_lo], -hi_f[at_hi]])
+        if len(M) > 0:
+                y, res = nnls(M.T, c)
+                dual = rhs @ y
+        else:
+                res, dual = np.linalg.norm(c), 0.
+        cx = c @ x
+        cert = {'max_violation': float(max(0., -np.min(slack, initial=0.))),
+                'dual_residual': float(res / (1 + np.linalg.norm(c))),
+                'gap': float(abs(cx - dual) / (1 + abs(cx))),
+                'n_active': len(act)}
+        cert['ok'] = bool(cert['max_violation'] <= tol and cert['dual_residual'] <= tol and cert['gap'] <= tol)
+        return cert
+
+# ======================================================================================================================
+
+def solve_lp(A: np.ndarray, b: np.ndarray, c: np.ndarray = None, lo: np.ndarray = None, hi: np.ndarray = None,
+             bound: float = 1e6, seed: int = 0, tol: float = 1e-10, check: bool = True) -> tuple[np.ndarray, dict]:
+        """ min c^T x  s.t.  A x >= b,  lo <= x <= hi  (c = sum of the rows of A if not given)
+            Seidel needs a bounded problem, so the missing (or infinite) bounds are replaced by +-bound. If the
+            solution lies on one of these artificial bounds ('box_active' in the certificate), it is not the optimum
+            of the problem that was asked and the problem is solved again with HiGHS (scipy linprog) without them.
+            The same fallback is used when Seidel reports infeasibility or the certificate fails ('fallback' is set).
+            Raises ValueError if linprog finds the problem infeasible or unbounded.
+            Returns x and its certificate (empty if check is False and there was no fallback).
+        """
+        A = np.asarray(A, dtype=np.float64)
+        b = np.asarray(b, dtype=np.float64).ravel()
+        d = A.shape[1]
+        c = np.sum(A, axis=0) if c is None else np.asarray(c, dtype=np.float64).ravel()
+        lo_user = np.full(d, -np.inf) if lo is None else np.asarray(lo, dtype=np.float64)
+        hi_user = np.full(d, np.inf) if hi is None else np.asarray(hi, dtype=np.float64)
+        lo = np.maximum(lo_user, -bound)
+        hi = np.minimum(hi_user, bound)
+        order = np.random.default_rng(seed).permutation(len(b))
+        try:
+                x = _seidel(A[order], b[order], c, lo, hi, tol)
+        except ValueError:
+                x = None
+        if x is not None:
+                box_active = bool(np.any((x <= lo + 1e-9 * bound) & (lo > lo_user)) or
+                                  np.any((x >= hi - 1e-9 * bound) & (hi < hi_user)))
+                if not check and not box_active:
+                        return x, {}
+                cert = certificate(A, b, c, x, lo, hi)
+                cert['box_active'] = box_active
+                cert['fallback'] = False
+                if cert['ok'] and not box_active:
+                        return x, cert
+        sol = linprog(c, A_ub=-A, b_ub=-b, method='highs',
+                      bounds=[(None if np.isinf(l) else l, None if np.isinf(h) else h) for l, h in zip(lo_user, hi_user)])
+        if sol.status != 0:
+                raise ValueError("The LP could not be solved: " + sol.message)
+        x = sol.x
+        cert = certificate(A, b, c, x, lo_user, hi_user)
+        cert['box_active'] = False
+        cert['fallback'] = True
+        return x, cert
+
+# ======================================================================================================================
+
+def solve_sat_LP(Phi: np.ndarray, H: np.ndarray, lo: np.ndarray = None, hi: np.ndarray = None, **kwargs) -> np.ndarray:
+        """ The saturation LP  min sum(Phi theta)  s.t.  Phi theta >= H, theta as a (3 x 1) column
+            Missing bounds are +-bound (1e6) in the Seidel solve, an optimum on them is solved again without the
+            artificial box (see solve_lp).
+        """
+        theta, _ = solve_lp(np.asarray(Phi), np.asarray(H), lo=lo, hi=hi, **kwargs)
+        return theta[:, np.newaxis]
+
+# ======================================================================================================================
+
+if __name__ == "__main__":
+        import time
+        from SatSysID import regressors as rgs
+
+        # Saturation LP of a synthetic day against linprog (HiGHS) and, if available, cvxpy
+        rng = np.random.default_rng(0)
+        N = 86400
+        T, F, u1 = 4 + 3 * rng.random(N), 3 + 10 * rng.random(N), 5 * rng.random(N)
+        Phi = rgs.PhiSat(T, F, u1)
+        theta = np.array([-0.2, 2.0, 1.0])
+        H = Phi @ theta - np.abs(rng.normal(0, 0.5, N))
+        c = np.sum(Phi, axis=0)
+
+        t0 = time.perf_counter()
+        x_sd, cert = solve_lp(Phi, H)
+        t_sd = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        sol = linprog(c, A_ub=-Phi, b_ub=-H, bounds=[(None, None)] * 3, method='highs')
+        t_hs = time.perf_counter() - t0
+        print("Saturation LP with {} rows".format(N))
+        print("  Seidel              : {:8.4f} s  certificate {}".format(t_sd, cert))
+        print("  linprog (HiGHS)     : {:8.4f} s  objective rel. diff {:.1e}".format(
+                t_hs, abs(c @ x_sd - sol.fun) / abs(sol.fun)))
+        try:
+                import cvxpy as cp
+                t0 = time.perf_counter()
+                th = cp.Variable([3, 1])
+                prob = cp.Problem(cp.Minimize(cp.sum(Phi @ th)), [Phi @ th >= H[:, np.newaxis]])
+                prob.solve()
+                t_cp = time.perf_counter() - t0
+                print("  cvxpy ({})     : {:8.4f} s  objective rel. diff {:.1e}".format(
+                        prob.solver_stats.solver_name, t_cp, abs(c @ x_sd - prob.value) / abs(prob.value)))
+        except ImportError:
+                print("  cvxpy               : not installed")
@@ -0,0 +1,112 @@
+import numpy as np
+
+"""Regression matrices of the saturated-system models, built with broadcasting.
+        PhiSat     : eta[k+1] = (u1[k]/F[k])   * [T**2 T 1] * theta
+        Phi_alpha  : aging factor           = [T**2 T 1] * theta
+        Phi_equlib : equilibrium eta        = (u2[k]/F[k]**2) * [T**2 T 1] * theta
+        Every builder writes into a preallocated (N x 3) buffer (out, or a new one of the given dtype, float32 to
+        halve the memory), and RegressorCache keeps the matrices of one data set so they are built only once.
+"""
+
+# ======================================================================================================================
+
+def T_basis(T: np.ndarray, scale: np.ndarray = None, out: np.ndarray = None, dtype=np.float64) -> np.ndarray:
+        """ Returns scale * [T**2 T 1] row by row (scale = 1 if not given) """
+        T = np.asarray(T, dtype=np.float64).ravel()
+        if out is None:
+                out = np.empty((len(T), 3), dtype=dtype)
+        np.multiply(T, T, out=out[:, 0], casting='unsafe')
+        out[:, 1] = T
+        out[:, 2] = 1
+        if scale is not None:
+                out *= np.asarray(scale, dtype=np.float64).ravel()[:, np.newaxis]
+        return out
+
+# ======================================================================================================================
+
+def PhiSat(T: np.ndarray, F: np.ndarray, u1: np.ndarray, out: np.ndarray = None, dtype=np.float64) -> np.ndarray:
+        """ Saturated-system regressor: rows (u1/F) * [T**2 T 1] """
+        return T_basis(T, np.divide(u1, F), out, dtype)
+
+# ======================================================================================================================
+
+def Phi_alpha(T: np.ndarray, out: np.ndarray = None, dtype=np.float64) -> np.ndarray:
+        """ Aging-factor regressor: rows [T**2 T 1] """
+        return T_basis(T, None, out, dtype)
+
+# ======================================================================================================================
+
+def Phi_equlib(T: np.ndarray, F: np.ndarray, u2: np.ndarray, out: np.ndarray = None, dtype=np.float64) -> np.ndarray:
+        """ Equilibrium regressor: rows (u2/F**2) * [T**2 T 1] """
+        return T_basis(T, np.divide(u2, np.square(F)), out, dtype)
+
+# ======================================================================================================================
+
+def row_quad_forms(Phi: np.ndarray, C: np.ndarray) -> np.ndarray:
+        """ Returns Phi[j, :] @ C @ Phi[j, :].T for all the rows j """
+        Phi = np.asarray(Phi)
+        return np.einsum('ij,jk,ik->i', Phi, np.asarray(C), Phi)
+
+# ======================================================================================================================
+
+class RegressorCache():
+        """ Regression matrices of one data set (dict with 'T', 'F', 'u1', 'u2'), built on first use and kept """
+        def __init__(self, data: dict[str, np.ndarray], dtype=np.float64):
+                self.data = data
+                self.dtype = dtype
+                self.cache = {}
+
+        def get(self, name: str) -> np.ndarray:
+                """ The regressor 'PhiSat', 'Phi_alpha' or 'Phi_equlib' of the whole data set """
+                if name not in self.cache:
+                        d = self.data
+                        match name:
+                                case 'PhiSat':
+                                        self.cache[name] = PhiSat(d['T'], d['F'], d['u1'], dtype=self.dtype)
+                                case 'Phi_alpha':
+                                        self.cache[name] = Phi_alpha(d['T'], dtype=self.dtype)
+                                case 'Phi_equlib':
+                                        self.cache[name] = Phi_equlib(d['T'], d['F'], d['u2'], dtype=self.dtype)
+                                case _:
+                                        raise ValueError("Unknown regressor: " + name)
+                return self.cache[name]
+
+        def PhiSat(self) -> np.ndarray:
+                return self.get('PhiSat')
+
+        def Phi_alpha(self) -> np.ndarray:
+                return self.get('Phi_alpha')
+
+        def Phi_equlib(self) -> np.ndarray:
+                return self.get('Phi_equlib')
+
+# ======================================================================================================================
+
+if __name__ == "__main__":
+        import time
+
+        # Against the row loop on a synthetic 86400-sample day
+        rng = np.random.default_rng(0)
+        N = 86400
+        T, F, u1 = 4 + 6 * rng.random(N), 3 + 10 * rng.random(N), 5 * rng.random(N)
+
+        t0 = time.perf_counter()
+        Phi_loop = np.zeros([N, 3])
+        for i in range(N):
+                Phi_loop[i, :] = (u1[i]/F[i]) * np.array([T[i]**2, T[i], 1])
+        t_loop = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        Phi_vec = PhiSat(T, F, u1)
+        t_vec = time.perf_counter() - t0
+
+        out = np.empty((N, 3), dtype=np.float32)
+        t0 = time.perf_counter()
+        PhiSat(T, F, u1, out=out)
+        t_32 = time.perf_counter() - t0
+
+        print("PhiSat of {} samples".format(N))
+        print("  row loop            : {:8.4f} s".format(t_loop))
+        print("  broadcast           : {:8.4f} s  ({:.0f}x)".format(t_vec, t_loop / t_vec))
+        print("  broadcast, float32  : {:8.4f} s  ({:.0f}x)".format(t_32, t_loop / t_32))
+        print("  max relative diff.  :", np.max(np.abs(Phi_vec - Phi_loop) / np.abs(Phi_loop)))
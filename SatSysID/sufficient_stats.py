@@ -0,0 +1,185 @@
+import numpy as np
+from SatSysID import regressors as rgs
+
+"""Sufficient statistics of the 3-parameter saturation model eta[k+1] = Phi[k, :] * theta.
+        The weighted least-squares problem of solve_QP depends on the data only through
+            PtWP = Phi^T diag(w^2) Phi  (3 x 3),   PtWH = Phi^T diag(w^2) H  (3 x 1),   HtWH = H^T diag(w^2) H
+        and the Fisher information only through PtP = Phi^T Phi, with w the weight vector of solve_QP.
+        SatStats keeps these sums (and the number of rows n). Rows are added or removed a block at a time, so a
+        data set can be streamed in chunks or segments without holding Phi. Two accumulators merge with + and a
+        sliding window drops its oldest block with -.
+"""
+
+# ======================================================================================================================
+
+class SatStats():
+        """ Running sums of the regression products of the saturation model """
+        def __init__(self, PtWP: np.ndarray = None, PtWH: np.ndarray = None, HtWH: float = 0., PtP: np.ndarray = None,
+                     n: int = 0):
+                self.PtWP = np.zeros([3, 3]) if PtWP is None else np.array(PtWP, dtype=np.float64)
+                self.PtWH = np.zeros([3, 1]) if PtWH is None else np.array(PtWH, dtype=np.float64).reshape(3, 1)
+                self.HtWH = float(HtWH)
+                self.PtP = np.zeros([3, 3]) if PtP is None else np.array(PtP, dtype=np.float64)
+                self.n = int(n)
+
+        # ==============================================================================================================
+
+        @staticmethod
+        def products(Phi: np.ndarray, H: np.ndarray, w: np.ndarray = None) -> tuple:
+                """ The products of one block of rows """
+                Phi = np.asarray(Phi, dtype=np.float64)
+                H = np.asarray(H, dtype=np.float64).ravel()
+                w2 = np.ones(len(H)) if w is None else np.square(np.asarray(w, dtype=np.float64).ravel())
+                wPhi = w2[:, np.newaxis] * Phi
+                return Phi.T @ wPhi, (wPhi.T @ H)[:, np.newaxis], float(np.dot(w2 * H, H)), Phi.T @ Phi, len(H)
+
+        def add(self, Phi: np.ndarray, H: np.ndarray, w: np.ndarray = None):
+                """ Adds the rows Phi, H (weights w, all ones if not given) """
+                PtWP, PtWH, HtWH, PtP, n = self.products(Phi, H, w)
+                self.PtWP += PtWP
+                self.PtWH += PtWH
+                self.HtWH += HtWH
+                self.PtP += PtP
+                self.n += n
+                return self
+
+        def remove(self, Phi: np.ndarray, H: np.ndarray, w: np.ndarray = None):
+                """ Removes rows that were added before (sliding windows) """
+                PtWP, PtWH, HtWH, PtP, n = self.products(Phi, H, w)
+                self.PtWP -= PtWP
+                self.PtWH -= PtWH
+                self.HtWH -= HtWH
+                self.PtP -= PtP
+                self.n -= n
+                return self
+
+        # ==============================================================================================================
+
+        def copy(self):
+                return SatStats(self.PtWP, self.PtWH, self.HtWH, self.PtP, self.n)
+
+        def __iadd__(self, other):
+                self.PtWP += other.PtWP
+                self.PtWH += other.PtWH
+                self.HtWH += other.HtWH
+                self.PtP += other.PtP
+                self.n += other.n
+                return self
+
+        def __isub__(self, other):
+                self.PtWP -= other.PtWP
+                self.PtWH -= other.PtWH
+                self.HtWH -= other.HtWH
+                self.PtP -= other.PtP
+                self.n -= other.n
+                return self
+
+        def __add__(self, other):
+                out = self.copy()
+                out += other
+                return out
+
+        def __sub__(self, other):
+                out = self.copy()
+                out -= other
+                return out
+
+        # ==============================================================================================================
+
+        @classmethod
+        def from_data(cls, Phi: np.ndarray, H: np.ndarray, w: np.ndarray = None):
+                """ Statistics of a regression matrix that is already built """
+                return cls().add(Phi, H, w)
+
+        @classmethod
+        def from_signals(cls, T: np.ndarray, F: np.ndarray, u1: np.ndarray, eta: np.ndarray, w: np.ndarray = None,
+                         chunk: int = 65536):
+                """ Statistics of eta[k+1] = PhiSat(T, F, u1)[k, :] * theta over one segment, with the regressor
+                    built chunk rows at a time (w weights the rows k = 0 ... N-2)
+                """
+                stats = cls()
+                N = len(T) - 1
+                buf = np.empty((min(chunk, max(N, 0)), 3))
+                for i in range(0, N, chunk):
+                        j = min(i + chunk, N)
+                        Phi = rgs.PhiSat(T[i:j], F[i:j], u1[i:j], out=buf[:j - i])
+                        stats.add(Phi, eta[i + 1:j + 1], None if w is None else w[i:j])
+                return stats
+
+        @classmethod
+        def merge(cls, parts):
+                """ Sum of the statistics of several segments """
+                stats = cls()
+                for part in parts:
+                        stats += part
+                return stats
+
+        # ==============================================================================================================
+
+        def solve(self, ridge: float = 0.) -> np.ndarray:
+                """ Unconstrained weighted least-squares estimate of theta (3 x 1) """
+                A = self.PtWP + ridge * np.eye(3)
+                try:
+                        return np.linalg.solve(A, self.PtWH)
+                except np.linalg.LinAlgError:
+                        return np.linalg.lstsq(A, self.PtWH, rcond=None)[0]
+
+        def cost(self, theta: np.ndarray) -> float:
+                """ Weighted sum of squares of Phi * theta - H """
+                theta = np.asarray(theta, dtype=np.float64).reshape(3, 1)
+                return (self.HtWH - 2 * (theta.T @ self.PtWH) + theta.T @ self.PtWP @ theta)[0, 0]
+
+        def fisher(self, lmbd: float) -> np.ndarray:
+                """ Fisher information of theta for half-normal errors, as Fisher_Information """
+                return (2*lmbd**2/np.pi) * self.PtP
+
+        def qp_terms(self) -> tuple[np.ndarray, np.ndarray]:
+                """ P and q of the objective (1/2) theta^T P theta - q^T theta of solve_QP """
+                return 2 * self.PtWP, 2 * self.PtWH
+
+# ======================================================================================================================
+
+if __name__ == "__main__":
+        import time
+
+        # Against the full regression matrix on a synthetic day
+        rng = np.random.default_rng(0)
+        N = 86400
+        T, F, u1 = 4 + 3 * rng.random(N), 3 + 10 * rng.random(N), 5 * rng.random(N)
+        theta = np.array([[-0.2], [2.0], [1.0]])
+        eta = np.zeros(N)
+        eta[1:] = (rgs.PhiSat(T, F, u1)[:-1] @ theta).ravel() - np.abs(rng.normal(0, 0.1, N - 1))
+        w = rng.random(N - 1)
+
+        t0 = time.perf_counter()
+        Phi = rgs.PhiSat(T, F, u1)[:-1]
+        w2 = w**2
+        theta_full = np.linalg.solve(Phi.T @ (w2[:, np.newaxis] * Phi), Phi.T @ (w2 * eta[1:]))
+        t_full = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        stats = SatStats.from_signals(T, F, u1, eta, w, chunk=4096)
+        theta_ss = stats.solve()
+        t_ss = time.perf_counter() - t0
+
+        # Sliding window of one hour, moved by ten minutes
+        L, step = 3600, 600
+        win = SatStats.from_signals(T[:L + 1], F[:L + 1], u1[:L + 1], eta[:L + 1], w[:L])
+        t0 = time.perf_counter()
+        for i in range(0, N - L - step - 1, step):
+                win.add(rgs.PhiSat(T[i + L:i + L + step], F[i + L:i + L + step], u1[i + L:i + L + step]),
+                        eta[i + L + 1:i + L + step + 1], w[i + L:i + L + step])
+                win.remove(rgs.PhiSat(T[i:i + step], F[i:i + step], u1[i:i + step]), eta[i + 1:i + step + 1],
+                           w[i:i + step])
+        t_win = time.perf_counter() - t0
+        i += step
+        last = SatStats.from_signals(T[i:i + L + 1], F[i:i + L + 1], u1[i:i + L + 1], eta[i:i + L + 1], w[i:i + L])
+
+        print("Weighted least squares of {} samples".format(N))
+        print("  full Phi            : {:8.4f} s".format(t_full))
+        print("  streamed statistics : {:8.4f} s".format(t_ss))
+        print("  max theta diff.     :", np.max(np.abs(theta_ss.ravel() - theta_full)))
+        I_full = (2/np.pi) * Phi.T @ Phi
+        print("  Fisher info rel.diff:", np.max(np.abs(stats.fisher(1.) - I_full) / np.abs(I_full)))
+        print("  sliding window      : {:8.4f} s, theta diff. to a fresh window {:.1e}".format(
+                t_win, np.max(np.abs(win.solve() - last.solve()))))
@@ -5,24 +5,15 @@ import matplotlib.pyplot as plt
 import DataProcessing.TestCellData.sosFiltering as sos
 from scipy.signal import sosfiltfilt
 from scipy.optimize import lsq_linear, linprog
+from SatSysID import regressors as rgs
 
 
 dg_rmc = dd.decimatedTestData(0, 2)
 ag_rmc = dd.decimatedTestData(1, 2)
 
-dg_phi = np.zeros([dg_rmc.ssd_data_len-1, 3])
-for i in range(dg_rmc.ssd_data_len-1):
-        u2_i = dg_rmc.ssd['u2'][i]
-        F_i = dg_rmc.ssd["F"][i]
-        T_i = dg_rmc.ssd["T"][i]
-        dg_phi[i,:] = (u2_i/F_i**2) * np.array([T_i**2, T_i, 1])
-
-ag_phi = np.zeros([ag_rmc.ssd_data_len-1, 3])
-for i in range(ag_rmc.ssd_data_len-1):
-        u2_i = ag_rmc.ssd['u2'][i]
-        F_i = ag_rmc.ssd["F"][i]
-        T_i = ag_rmc.ssd["T"][i]
-        ag_phi[i,:] = (u2_i/F_i**2) * np.array([T_i**2, T_i, 1])
+# Equilibrium regressors (u2/F**2) * [T**2 T 1] of the samples 0 ... N-2
+dg_phi = rgs.RegressorCache(dg_rmc.ssd).Phi_equlib()[:-1]
+ag_phi = rgs.RegressorCache(ag_rmc.ssd).Phi_equlib()[:-1]
 
 
 dg_sol = linprog(np.sum(dg_phi, axis=0), A_ub=-dg_phi, b_ub = -dg_rmc.ssd['eta'][1:])
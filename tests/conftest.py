@@ -0,0 +1,4 @@
+import os, sys
+
+# The modules are imported from the repository root, as the scripts are run from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import scipy.signal as sig
+from DataProcessing import segments as sg
+from DataProcessing import batch_filtering as bf
+
+lp_filt = sig.cheby2(7, 40, 0.1, 'low', analog=False, fs=5, output='sos')
+
+
+def sosff_loop(tskips, x, pad_len=24):
+    """ sosff_TD of the baseline, one channel at a time """
+    y = np.zeros(np.shape(x))
+    for i in range(1, len(tskips)):
+        if len(x[tskips[i-1]:tskips[i]]) > pad_len:
+            y[tskips[i-1]:tskips[i]] = sig.sosfiltfilt(lp_filt, x[tskips[i-1]:tskips[i]])
+        else:
+            y[tskips[i-1]:tskips[i]] = x[tskips[i-1]:tskips[i]]
+    return y
+
+
+def gapped_channels(n, k, seed=0):
+    """ k channels with the NaN rows dropped, and the segments of their time """
+    rng = np.random.default_rng(seed)
+    t = 0.2 * np.arange(n)
+    X = np.cumsum(rng.normal(size=(k, n)), axis=1)
+    X[:, rng.choice(n, n // 50, replace=False)] = np.nan
+    X[:, 500:520] = np.nan
+    X[:, 521:540] = np.nan                              # Single-sample segment at 520
+    keep = ~np.any(np.isnan(X), axis=0)
+    return X[:, keep], sg.find_segments(t[keep], 0.3)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_sosfiltfilt_segments_matches_the_loop(workers):
+    X, segs = gapped_channels(3000, 4)
+    assert np.any(segs.lengths == 1)
+    Y = bf.sosfiltfilt_segments(lp_filt, segs, X, pad_len=24, workers=workers)
+    for x, y in zip(X, Y):
+        assert np.allclose(y, sosff_loop(segs.offsets, x), rtol=1e-12, atol=1e-12)
+
+
+def test_sosfiltfilt_segments_of_empty_input():
+    segs = sg.find_segments(np.zeros(0), 0.3)
+    Y = bf.sosfiltfilt_segments(lp_filt, segs, np.zeros((3, 0)))
+    assert np.shape(Y) == (3, 0)
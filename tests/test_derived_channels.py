@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from DataProcessing import derived_channels as dch
+from DataProcessing import segments as sg
+
+
+def eta_loop(x1, u1, offsets, clamp):
+    eta = np.zeros(len(x1))
+    for a, b in zip(offsets[:-1], offsets[1:]):
+        for k in range(a + 1, b):
+            eta[k] = u1[k-1] - x1[k]
+            if clamp:
+                eta[k] = max(eta[k], 0)
+        if b - a > 1:
+            eta[a] = eta[a + 1]
+    return eta
+
+
+@pytest.mark.parametrize("clamp", [True, False])
+def test_eta_follows_the_clamp_of_the_data_set(clamp):
+    rng = np.random.default_rng(0)
+    x1, u1 = rng.normal(1, 1, 50), rng.normal(1, 1, 50)
+    offsets = [0, 20, 21, 50]
+    data = {'x1': x1.copy(), 'u1': u1.copy(), 'segments': sg.SegmentIndex(offsets)}
+    dch.derive_channels(data, channels=['eta'], clamp=clamp)
+    expected = eta_loop(x1, u1, offsets, clamp)
+    assert np.allclose(data['eta'][[i for i in range(50) if i != 20]], np.delete(expected, 20))
+    assert data['eta'][20] == 0                         # Single-sample segment
+    assert np.any(data['eta'] < 0) != clamp
+
+
+def test_clamp_has_no_default():
+    with pytest.raises(TypeError):
+        dch.derive_channels({'y1': np.ones(3), 'u1': np.ones(3)}, channels=['eta'])
@@ -0,0 +1,73 @@
+import numpy as np
+import scipy.signal as sig
+from DataProcessing.TruckData import drive_cycles as dc
+
+
+def test_gap_sweep_empty():
+    sweep = dc.gap_sweep(np.zeros(0), [60, 120])
+    for gap in [60, 120]:
+        assert sweep[gap]['n_segments'] == 0
+        assert sweep[gap]['n_cycles'] == 0
+        assert len(sweep[gap]['lengths']) == 0
+        assert sweep[gap]['total_len'] == 0
+
+
+def test_gap_sweep_matches_find_drive_cycles():
+    t = np.concatenate([np.arange(2000.), np.arange(2030., 2100.), np.arange(3000., 3001.), np.arange(9000., 12000.)])
+    sweep = dc.gap_sweep(t, [60, 20, 5000])
+    for gap in [20, 60, 5000]:
+        offsets = dc.find_drive_cycles(t, gap)
+        assert np.array_equal(sweep[gap]['drive_cycles'], offsets)
+        durations = [np.ceil(t[b - 1] - t[a]) for a, b in zip(offsets[:-1], offsets[1:])]
+        lengths = [d for d in durations if d > 1200]
+        assert np.array_equal(sweep[gap]['lengths'], lengths)
+        assert sweep[gap]['total_len'] == sum(lengths)
+
+
+def drive_cycle_loop(t, X):
+    """ The per-channel drive cycle of the baseline gen_drive_cycles """
+    ssd = {'t': np.arange(np.min(t), np.max(t))}
+    floors = {'y1': 0, 'u1': 0.2, 'u2': 0.1, 'F': 3}
+    for key, x in zip(dc.dc_keys, X):
+        ssd[key] = sig.sosfiltfilt(dc.drive_cycle_filt, np.interp(ssd['t'], t, x))
+        if key in floors:
+            ssd[key] = np.array([val if val >= floors[key] else floors[key] for val in ssd[key]])
+    eta = np.zeros(len(ssd['t']))
+    for i in range(1, len(eta)):
+        eta[i] = max(ssd['u1'][i-1] - ssd['y1'][i], 0)
+    eta[0] = eta[1]
+    ssd['eta'] = eta
+    return ssd
+
+
+def irregular_cycle(n, seed=0):
+    """ Time stamps with dropped samples and non-integer steps, and the dc_keys channels """
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.choice([0.5, 1., 1., 2., 7.], n)) + 100.25
+    X = np.abs(np.cumsum(rng.normal(0, 0.3, (len(dc.dc_keys), n)), axis=1))
+    return t, X
+
+
+def test_interp_cycle_matches_np_interp():
+    t, X = irregular_cycle(2000)
+    grid, Y = dc.interp_cycle(t, X)
+    assert np.array_equal(grid, np.arange(t[0], t[-1]))
+    for x, y in zip(X, Y):
+        assert np.allclose(y, np.interp(grid, t, x), rtol=1e-12, atol=1e-12)
+
+
+def test_interp_cycle_unsorted_and_repeated_time():
+    t = np.array([3., 0., 1., 1., 5.])
+    X = np.array([[3., 0., 1., 1., 5.]])
+    grid, Y = dc.interp_cycle(t, X)
+    assert np.array_equal(grid, np.arange(0., 5.))
+    assert np.allclose(Y[0], grid)
+
+
+def test_gen_drive_cycle_matches_the_loop():
+    t, X = irregular_cycle(2000)
+    ssd = dc.gen_drive_cycle(t, X)
+    expected = drive_cycle_loop(t, X)
+    assert ssd['data_len'] == len(expected['t'])
+    for key in ['t'] + dc.dc_keys + ['eta']:
+        assert np.allclose(ssd[key], expected[key], rtol=1e-10, atol=1e-10), key
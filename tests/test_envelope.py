@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from scipy.optimize import minimize
+from SatSysID import envelope as env
+from SatSysID import lowdim_lp as lp
+from SatSysID import regressors as rgs
+from SatSysID import sufficient_stats as ss
+
+
+def saturation_rows(N=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    T, F, u1 = 4 + 3 * rng.beta(2, 3, N), 3 + 10 * rng.random(N), 5 * rng.random(N)
+    Phi = rgs.PhiSat(T, F, u1)
+    H = Phi @ np.array([-0.2, 2.0, 1.0]) - np.abs(rng.normal(0, 0.5, N))
+    return Phi, H
+
+
+def lp_rows(Phi, H):
+    """ The 'seidel' LP_rows of solve_LP: objective of all the rows, constraints of the given ones """
+    c = np.sum(Phi, axis=0)
+    return lambda rows: lp.solve_sat_LP(Phi[rows], H[rows], c=c)
+
+
+def qp_rows(Phi, H):
+    """ QP_rows of solve_QP (unit weights, theta[0] <= 0, theta[1:] >= 0) with SLSQP instead of MOSEK """
+    P, q = ss.SatStats.from_data(Phi, H).qp_terms()
+    signs = np.array([-1., 1., 1.])
+
+    def solve(rows):
+        cons = [{'type': 'ineq', 'fun': lambda x: Phi[rows] @ x - H[rows], 'jac': lambda x: Phi[rows]},
+                {'type': 'ineq', 'fun': lambda x: signs * x, 'jac': lambda x: np.diag(signs)}]
+        sol = minimize(lambda x: 0.5 * x @ P @ x - q.ravel() @ x, np.array([-0.1, 1., 1.]),
+                       jac=lambda x: P @ x - q.ravel(), constraints=cons, method='SLSQP',
+                       options={'ftol': 1e-12, 'maxiter': 500})
+        return sol.x[:, np.newaxis] if sol.success else None
+    return solve
+
+
+def test_candidates_keep_every_active_row():
+    Phi, H = saturation_rows()
+    theta = lp_rows(Phi, H)(np.arange(len(H)))
+    active = np.flatnonzero(np.abs(Phi @ theta.ravel() - H) <= 1e-7 * (1 + np.abs(H)))
+    assert np.all(np.isin(active, env.candidate_rows(Phi, H)))
+
+
+def test_pruned_lp_matches_all_rows():
+    Phi, H = saturation_rows()
+    solve = lp_rows(Phi, H)
+    theta, rows = env.solve_pruned(solve, Phi, H)
+    assert len(rows) < len(H)
+    assert np.allclose(theta, solve(np.arange(len(H))), rtol=1e-6, atol=1e-8)
+
+
+def test_unbounded_subset_falls_back_to_all_rows():
+    Phi, H = saturation_rows()
+    solve = lp_rows(Phi, H)
+    with pytest.raises(ValueError):
+        solve(np.array([0]))                            # One row leaves the LP unbounded
+    theta, rows = env.solve_pruned(solve, Phi, H, rows=np.array([0]))
+    assert len(rows) == len(H)
+    assert np.allclose(theta, solve(np.arange(len(H))), rtol=1e-6, atol=1e-8)
+
+
+def test_pruned_qp_matches_all_rows():
+    Phi, H = saturation_rows(1000)
+    solve = qp_rows(Phi, H)
+    theta, rows = env.solve_pruned(solve, Phi, H)
+    assert len(rows) < len(H)
+    assert np.allclose(theta, solve(np.arange(len(H))), rtol=1e-5, atol=1e-6)
+
+
+def test_violated_rows_are_added_back():
+    Phi, H = saturation_rows()
+    solve = lp_rows(Phi, H)
+    calls = []
+    theta, rows = env.solve_pruned(lambda r: calls.append(len(r)) or solve(r), Phi, H,
+                                   rows=env.candidate_rows(Phi, H)[::4])
+    assert len(calls) > 1
+    assert len(env.violated_rows(Phi, H, theta)) == 0
+    assert np.allclose(theta, solve(np.arange(len(H))), rtol=1e-6, atol=1e-8)
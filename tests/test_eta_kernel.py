@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from DataProcessing import segments as sg
+from DataProcessing import eta_kernel as ek
+
+
+def calc_eta_loop(x1, u1, tskips):
+    """ calc_eta_TD of the baseline (the segments need two samples or more) """
+    eta = np.zeros(len(x1))
+    for i in range(len(tskips)-1):
+        a, b = tskips[i], tskips[i+1]
+        for k in range(a + 1, b):
+            eta[k] = u1[k-1] - x1[k]
+            if eta[k] < 0:
+                eta[k] = 0
+        eta[a] = eta[a + 1]
+    return eta
+
+
+def gapped_signals(n, seed=0):
+    """ x1, u1 and their segments with the NaN rows dropped """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n, dtype=float)
+    x1, u1 = rng.normal(1, 1, n), rng.normal(1, 1, n)
+    x1[rng.choice(n, n // 20, replace=False)] = np.nan
+    keep = ~np.isnan(x1)
+    return x1[keep], u1[keep], sg.find_segments(t[keep], 1.5)
+
+
+def test_calc_eta_segments_matches_the_loop():
+    x1, u1, segs = gapped_signals(2000)
+    long_segs = sg.SegmentIndex(segs.offsets[np.concatenate(([True], segs.lengths > 1))])
+    # The single-sample segments are merged into the previous one for the loop
+    eta = ek.calc_eta_segments(x1, u1, long_segs)
+    assert np.allclose(eta, calc_eta_loop(x1, u1, long_segs.offsets))
+
+
+def test_single_sample_segment():
+    x1, u1 = np.array([0., 1., 2., 3., 0.5]), np.array([4., 4., 4., 4., 4.])
+    eta = ek.calc_eta_segments(x1, u1, [0, 2, 3, 5])
+    assert np.allclose(eta, [3., 3., 0., 3.5, 3.5])     # The segment [2, 3) has no previous u1
+
+
+def test_clamp_and_out():
+    x1, u1, segs = gapped_signals(500)
+    out = np.empty(len(x1))
+    eta = ek.calc_eta_segments(x1, u1, segs, clamp=False, out=out)
+    assert eta is out
+    assert np.any(eta < 0)
+    assert np.allclose(np.maximum(eta, 0), ek.calc_eta_segments(x1, u1, segs))
+
+
+@pytest.mark.parametrize("clamp", [True, False])
+def test_empty_input(clamp):
+    eta = ek.calc_eta_segments(np.zeros(0), np.zeros(0), sg.find_segments(np.zeros(0), 1.5), clamp=clamp)
+    assert len(eta) == 0
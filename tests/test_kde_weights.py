@@ -0,0 +1,24 @@
+import numpy as np
+from scipy.stats import gaussian_kde
+from SatSysID import kde_weights as kw
+
+
+def test_exact_matches_the_point_loop():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(4, 300))
+    pdf = gaussian_kde(X)
+    w_loop = np.array([1/pdf(X[:, i]) for i in range(X.shape[1])]).flatten()
+    w_loop /= np.sum(w_loop)
+    assert np.allclose(kw.kde_weights(X, cache=False), w_loop, rtol=1e-12)
+
+
+def test_cache_is_bounded_and_returns_copies():
+    kw.clear_cache()
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(4, 200))
+    w = kw.kde_weights(X, 'tree')
+    w[:] = 0                                            # Callers may modify the weights
+    assert np.all(kw.kde_weights(X, 'tree') > 0)
+    for _ in range(kw.cache_size + 3):
+        kw.kde_weights(rng.normal(size=(4, 50)), 'tree')
+    assert len(kw._weights_cache) == kw.cache_size
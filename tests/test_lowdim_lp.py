@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from scipy.optimize import linprog
+from SatSysID import lowdim_lp as ll
+from SatSysID import regressors as rgs
+
+
+def test_saturation_lp_matches_linprog():
+    rng = np.random.default_rng(0)
+    N = 5000
+    T, F, u1 = 4 + 3 * rng.random(N), 3 + 10 * rng.random(N), 5 * rng.random(N)
+    Phi = rgs.PhiSat(T, F, u1)
+    H = Phi @ np.array([-0.2, 2.0, 1.0]) - np.abs(rng.normal(0, 0.5, N))
+    c = np.sum(Phi, axis=0)
+    x, cert = ll.solve_lp(Phi, H)
+    sol = linprog(c, A_ub=-Phi, b_ub=-H, bounds=[(None, None)] * 3, method='highs')
+    assert cert['ok'] and not cert['fallback']
+    assert abs(c @ x - sol.fun) <= 1e-9 * abs(sol.fun)
+
+
+def test_optimum_beyond_the_default_box():
+    x, cert = ll.solve_lp(np.array([[1.]]), np.array([-2e6]), c=np.array([1.]))
+    assert cert['fallback']
+    assert x[0] == pytest.approx(-2e6)
+
+
+def test_infeasible_and_unbounded_raise():
+    with pytest.raises(ValueError):
+        ll.solve_lp(np.array([[1.], [-1.]]), np.array([1., 0.]))
+    with pytest.raises(ValueError):
+        ll.solve_lp(np.array([[1., 1.]]), np.array([0.]), c=np.array([1., 0.]))
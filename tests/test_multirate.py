@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import scipy.signal as sig
+from DataProcessing import segments as sg
+from DataProcessing import multirate as mr
+
+
+def decimate_loop(tskips, x, q):
+    """ One resample_poly call per segment and channel """
+    y = []
+    for i in range(len(tskips)-1):
+        seg = x[tskips[i]:tskips[i+1]]
+        y.append(sig.resample_poly(seg, up=1, down=q, padtype='line') if len(seg) > 1 else seg)
+    return np.concatenate(y)
+
+
+def decimate_time_loop(tskips, t, q):
+    """ decimate_time2OneHz of the baseline """
+    s = []
+    for i in range(len(tskips)-1):
+        s_des = t[tskips[i]] + np.arange(np.ceil(len(t[tskips[i]:tskips[i+1]])/q))
+        s = np.concatenate((s, s_des), axis=0)
+    return np.array(s).flatten()
+
+
+def gapped_data(n, k, seed=0):
+    """ Time and k channels at 5 Hz with the NaN rows dropped """
+    rng = np.random.default_rng(seed)
+    t = 0.2 * np.arange(n)
+    X = np.cumsum(rng.normal(size=(k, n)), axis=1)
+    X[:, rng.choice(n, n // 50, replace=False)] = np.nan
+    X[:, 700:710] = np.nan
+    X[:, 711:720] = np.nan                              # Single-sample segment at 710
+    keep = ~np.any(np.isnan(X), axis=0)
+    return t[keep], X[:, keep]
+
+
+def test_decimate_segments_matches_the_loop():
+    t, X = gapped_data(3000, 3)
+    segs = sg.find_segments(t, 0.3)
+    assert np.any(segs.lengths == 1)
+    Y, out_segs = mr.decimate_segments(segs, X, 5)
+    assert np.array_equal(out_segs.lengths, -(-segs.lengths // 5))
+    for x, y in zip(X, Y):
+        assert np.allclose(y, decimate_loop(segs.offsets, x, 5), rtol=1e-12, atol=1e-12)
+    assert np.allclose(mr.decimate_time(segs, t, 5, 1.0), decimate_time_loop(segs.offsets, t, 5))
+
+
+def test_decimate_segments_of_empty_input():
+    segs = sg.find_segments(np.zeros(0), 0.3)
+    Y, out_segs = mr.decimate_segments(segs, np.zeros((2, 0)), 5)
+    assert np.shape(Y) == (2, 0)
+    assert out_segs.data_len == 0
+    assert len(mr.decimate_time(segs, np.zeros(0), 5, 1.0)) == 0
+
+
+@pytest.mark.parametrize("dt_in, q", [(0.2, 5), (0.1, 10)])
+def test_decimate_data_detects_the_rate(dt_in, q):
+    t, X = gapped_data(3000, 2)
+    t = t * dt_in / 0.2
+    data = {'t': t, 'a': X[0], 'b': X[1], 'segments': sg.find_segments(t, 1.5 * dt_in)}
+    dec = mr.decimate_data(data, ['a', 'b'], 1.0)
+    assert np.allclose(dec['a'], decimate_loop(data['segments'].offsets, X[0], q))
+    assert np.allclose(dec['t'], decimate_time_loop(data['segments'].offsets, t, q))
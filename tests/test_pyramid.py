@@ -0,0 +1,55 @@
+import os, sys
+import numpy as np
+from types import SimpleNamespace
+from DataProcessing import segments as sg
+from DataProcessing import derived_channels as dch
+from DataProcessing import eta_kernel as ek
+from DataProcessing import multirate as mr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'DataProcessing',
+                                'TestCellData'))
+import decimate_data as dd                              # noqa: E402
+
+
+def filtered_ssd(n=20000, seed=0):
+    """ Smooth 5 Hz ssd channels with NaN rows dropped (short gaps and a few long ones), with eta """
+    rng = np.random.default_rng(seed)
+    t = 0.2 * np.arange(n)
+    keep = np.ones(n, dtype=bool)
+    keep[rng.choice(n, n // 100, replace=False)] = False
+    for start in rng.choice(n - 200, 6, replace=False):
+        keep[start:start + rng.integers(5, 200)] = False
+    ssd = {'t': t[keep]}
+    for key in ['x1', 'x2', 'u1', 'u2', 'F', 'T', 'mu']:
+        ssd[key] = 2 + np.sin(t[keep] / rng.uniform(20, 200)) + 0.01*rng.standard_normal(np.sum(keep))
+    ssd['segments'] = sg.find_segments(ssd['t'], 1.5 * 0.2)
+    ssd['t_skips'] = ssd['segments'].offsets
+    return dch.derive_channels(ssd, channels=['eta'], clamp=True)
+
+
+def decimated(ssd):
+    dec = object.__new__(dd.decimatedTestData)
+    dec.filtData = SimpleNamespace(ssd=ssd, iod=None, name='synthetic')
+    dec.dt = 1
+    dec.pyramids = {}
+    return dec
+
+
+def test_level_1_is_the_1hz_view():
+    dec = decimated(filtered_ssd())
+    ssd = dec.decimate_ssd()
+    level = dec.pyramid('ssd', [1, 5, 20]).level(1)
+    assert np.array_equal(level['t_skips'], ssd['t_skips'])
+    for key in ssd:
+        if key not in ('t_skips', 'segments'):
+            assert np.allclose(level[key], ssd[key], rtol=1e-12, atol=1e-12), key
+    assert dec.pyramid('ssd', (1, 5, 20)) is dec.pyramid('ssd', [1, 5, 20])
+
+
+def test_coarse_levels_follow_their_one_step_model():
+    pyr = decimated(filtered_ssd()).pyramid('ssd')
+    for dt_f, dt_c in zip(pyr.dt_levels[:-1], pyr.dt_levels[1:]):
+        fine, coarse = pyr.level(dt_f), pyr.level(dt_c)
+        assert np.allclose(coarse['eta'], ek.calc_eta_segments(coarse['x1'], coarse['u1'], coarse['segments']))
+        eta_dec, _ = mr.decimate_segments(fine['segments'], fine['eta_dec'], dt_c // dt_f)
+        assert np.allclose(coarse['eta_dec'], eta_dec[0])
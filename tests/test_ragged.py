@@ -0,0 +1,18 @@
+import numpy as np
+from DataProcessing import ragged as rg
+
+
+def cycle(n, v):
+    return {'t': np.arange(n, dtype=float), 'y1': np.full(n, float(v))}
+
+
+def test_ties_keep_their_order_however_the_set_is_built():
+    cycles = [cycle(3, 0), cycle(5, 1), cycle(3, 2), cycle(5, 3), cycle(1, 4), cycle(3, 5)]
+    labels = [str(i) for i in range(len(cycles))]
+    whole = rg.RaggedCycles.from_cycles(cycles, ['t', 'y1'], labels)
+    parts = rg.RaggedCycles.concatenate([rg.RaggedCycles.from_cycles(cycles[:2], ['t', 'y1'], labels[:2]),
+                                         rg.RaggedCycles.from_cycles(cycles[2:], ['t', 'y1'], labels[2:])])
+    assert list(whole.labels) == ['1', '3', '0', '2', '5', '4']
+    assert list(parts.labels) == list(whole.labels)
+    for key in ['t', 'y1']:
+        assert np.array_equal(parts.buffers[key], whole.buffers[key])
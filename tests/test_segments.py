@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from DataProcessing import segments as sg
+
+
+def discontinuities_loop(t, dt):
+    """ find_discontinuities of the baseline """
+    t_skips = [i for i in range(1, len(t)) if t[i] - t[i-1] > 1.5*dt]
+    return np.array([0] + t_skips + [len(t)])
+
+
+def gapped_time(n, dt, seed=0):
+    """ Time of n samples with the NaN rows dropped, as the filt_data modules do """
+    rng = np.random.default_rng(seed)
+    t = dt * np.arange(n)
+    x = rng.normal(size=n)
+    x[rng.choice(n, n // 20, replace=False)] = np.nan
+    x[n//2 - 3:n//2] = np.nan                          # Leaves a single-sample segment at n//2
+    x[n//2 + 1:n//2 + 4] = np.nan
+    return t[~np.isnan(x)]
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 1000])
+def test_find_segments_matches_the_loop(n):
+    t = gapped_time(n, 0.2) if n > 10 else 0.2 * np.arange(n)
+    assert np.array_equal(sg.find_segments(t, 1.5 * 0.2).offsets, discontinuities_loop(t, 0.2))
+
+
+def test_single_sample_segment():
+    t = gapped_time(1000, 0.2)
+    segs = sg.find_segments(t, 0.3)
+    assert np.any(segs.lengths == 1)
+    assert np.sum(segs.lengths) == len(t)
+
+
+@pytest.mark.parametrize("n", [0, 1000])
+def test_sweep_segments_matches_find_segments(n):
+    t = gapped_time(n, 1.0) if n > 0 else np.zeros(0)
+    steps = [5.0, 1.5, 3.0]
+    sweep = sg.sweep_segments(t, steps)
+    assert list(sweep) == steps
+    for step in steps:
+        assert np.array_equal(sweep[step].offsets, discontinuities_loop(t, step / 1.5))
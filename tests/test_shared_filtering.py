@@ -0,0 +1,57 @@
+import os, sys
+import numpy as np
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'DataProcessing',
+                                'TestCellData'))
+import filt_data as fd                                  # noqa: E402
+
+
+def synthetic_test(raw_nans: list[str], name: str = 'dg_rmc'):
+    """ FilteredTestData on a synthetic 5 Hz raw data set, NaN gaps in the channels raw_nans """
+    rng = np.random.default_rng(0)
+    n = 4000
+    raw = {'t': 0.2 * np.arange(n)}
+    for key in ['x1', 'x2', 'y1', 'u1', 'u2', 'T', 'F', 'mu']:
+        raw[key] = 5 + np.cumsum(rng.normal(0, 0.05, n))
+    for key in raw_nans:
+        raw[key][rng.choice(n, n // 40, replace=False)] = np.nan
+    raw[raw_nans[0]][1000:1010] = np.nan
+    raw[raw_nans[0]][1011:1020] = np.nan                # Single-sample segment at 1010
+    ftd = object.__new__(fd.FilteredTestData)
+    ftd.hftp_set, ftd.cftp_set, ftd.rmc_set = [], [], []
+    ftd.rawData = SimpleNamespace(raw=raw, dt=0.2, name=name)
+    ftd.dt, ftd.name, ftd.filt_workers = 0.2, name, 1
+    return ftd
+
+
+def test_shared_matches_separate_when_the_rows_coincide():
+    ftd = synthetic_test(['t', 'u1', 'T'])
+    ssd, iod = ftd.gen_shared()
+    for shared, separate in [(ssd, ftd.gen_ssd()), (iod, ftd.gen_iod())]:
+        assert np.any(shared['segments'].lengths == 1)
+        assert np.array_equal(shared['t_skips'], separate['t_skips'])
+        for key in separate:
+            if key not in ('t_skips', 'segments'):
+                assert np.allclose(shared[key], separate[key], rtol=1e-12, atol=1e-12), key
+
+
+def test_shared_matches_separate_when_the_rows_differ():
+    ftd = synthetic_test(['u1', 'x1', 'y1'])
+    ssd, iod = ftd.gen_shared()
+    spans = [set(zip(d['t'][d['segments'].starts], d['segments'].lengths)) for d in (ssd, iod)]
+    assert 0 < len(spans[0] & spans[1]) < len(spans[0])  # Some segments are shared, others are not
+    for shared, separate in [(ssd, ftd.gen_ssd()), (iod, ftd.gen_iod())]:
+        assert np.array_equal(shared['t_skips'], separate['t_skips'])
+        for key in separate:
+            if key not in ('t_skips', 'segments'):
+                assert np.allclose(shared[key], separate[key], rtol=1e-12, atol=1e-12), key
+    assert not np.array_equal(ssd['t'], iod['t'])
+
+
+def test_empty_data_sets():
+    ftd = synthetic_test(['t'])
+    ftd.rawData.raw['y1'][:] = np.nan
+    ssd, iod = ftd.gen_shared()
+    assert len(iod['t']) == 0
+    assert np.allclose(ssd['u1'], ftd.gen_ssd()['u1'])
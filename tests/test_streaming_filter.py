@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import scipy.signal as sig
+from DataProcessing import segments as sg
+from DataProcessing.TruckData import sosFiltering as sf
+
+
+def one_shot(t, X, sos=sf.lp_filt, max_step=3):
+    """ sosfilt of every whole segment, started at the steady state of its first sample """
+    X = np.atleast_2d(X)
+    Y = np.empty(np.shape(X))
+    zi_step = sig.sosfilt_zi(sos)
+    for seg in sg.find_segments(t, max_step).slices():
+        zi = zi_step[:, None, :] * X[:, seg.start][None, :, None]
+        Y[:, seg], _ = sig.sosfilt(sos, X[:, seg], axis=-1, zi=zi)
+    return Y
+
+
+def gapped_telemetry(n=5000, seed=0):
+    """ 1 Hz samples of 3 channels with dropped rows and a few long gaps """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n, dtype=float)
+    keep = rng.random(n) > 0.02
+    for start in rng.choice(n - 100, 5, replace=False):
+        keep[start:start + rng.integers(4, 100)] = False
+    X = np.cumsum(rng.normal(size=(3, n)), axis=1)
+    return t[keep], X[:, keep]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_chunks_match_one_shot(seed):
+    t, X = gapped_telemetry(seed=seed)
+    segs = sg.find_segments(t, 3)
+    rng = np.random.default_rng(seed)
+    # Random cuts, plus cuts on the segment boundaries and one sample after them
+    cuts = np.unique(np.concatenate((rng.choice(len(t), 40, replace=False), segs.starts[1:3], segs.starts[3:5] + 1)))
+    filt = sf.StreamingFilter()
+    Y = np.concatenate([filt.process(t[a:b], X[:, a:b]) for a, b in zip(np.r_[0, cuts], np.r_[cuts, len(t)])],
+                       axis=1)
+    assert np.allclose(Y, one_shot(t, X), rtol=1e-10, atol=1e-10)
+
+
+def test_single_channel_and_empty_chunks():
+    t, X = gapped_telemetry()
+    filt = sf.StreamingFilter()
+    y = [filt.process(t[:1000], X[0, :1000]), filt.process(t[:0], X[0, :0]), filt.process(t[1000:], X[0, 1000:])]
+    assert [np.ndim(part) for part in y] == [1, 1, 1]
+    assert np.allclose(np.concatenate(y), one_shot(t, X[0])[0], rtol=1e-10, atol=1e-10)
+
+
+def test_reset_starts_a_new_segment():
+    t, X = gapped_telemetry()
+    filt = sf.StreamingFilter()
+    filt.process(t[:2000], X[:, :2000])
+    filt.reset()
+    assert np.allclose(filt.process(t[2000:], X[:, 2000:]), one_shot(t[2000:], X[:, 2000:]), rtol=1e-10, atol=1e-10)
@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pytest
+from scipy.io import savemat
+from DataProcessing.TruckData import truck_store as ts
+
+
+def write_day(path, tod, seed):
+    """ Day file with the variables read by RawTruckDay, SCR temperature inside the window """
+    rng = np.random.default_rng(seed)
+    n = len(tod)
+    col = lambda x: np.asarray(x, dtype=float)[:, np.newaxis]
+    savemat(path, {'tod': col(tod), 'pSCRBedTemp': col(250 + 30*np.sin(tod/2000)),
+                   'pExhMF': col(50 + 10*rng.random(n)), 'pUreaDosing': col(rng.random(n)),
+                   'pNOxInppm': col(300*rng.random(n)), 'pNOxOutppm': col(30*rng.random(n))})
+
+
+@pytest.fixture
+def days(tmp_path, monkeypatch):
+    """ Day 1 is one open segment up to midnight, day 2 closes it (a 9399 s cycle) and opens another """
+    monkeypatch.chdir(tmp_path)                         # The day files keep their converted arrays under ./
+    files = {'trk_1': str(tmp_path / "F_T_ALA_180313.mat"), 'trk_2': str(tmp_path / "F_T_ALA_180314.mat")}
+    write_day(files['trk_1'], np.arange(80000, 86400), 1)
+    write_day(files['trk_2'], np.concatenate([np.arange(0, 3000), np.arange(5000, 7000)]), 2)
+    return files
+
+
+def build(files, root):
+    store = ts.TruckStore("trk", store_root=str(root))
+    for day, dat_file in files.items():
+        store.ingest(day, dat_file)
+    return store
+
+
+def assert_same_cycles(a, b):
+    assert list(a.labels) == list(b.labels)
+    for key in ts.cycle_keys:
+        assert np.array_equal(a.buffers[key], b.buffers[key])
+
+
+def test_cycle_across_midnight(days, tmp_path):
+    store = build(days, tmp_path / "store")
+    assert len(store.index["chunks"]) == 1
+    assert sorted(store.index["chunks"][0]["sources"]) == ['trk_1', 'trk_2']
+    cycles = store.cycles(include_tail=False)
+    assert len(cycles) == 1
+    assert cycles[0]['data_len'] == 9399
+
+
+def test_changed_earlier_day_rebuilds_the_chunk(days, tmp_path):
+    store = build(days, tmp_path / "store")
+    old = store.cycles()
+    write_day(days['trk_1'], np.arange(80000, 86400), 3)            # Same size, other data
+    st = os.stat(days['trk_1'])
+    os.utime(days['trk_1'], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    new = ts.TruckStore("trk", store_root=str(tmp_path / "store")).cycles()
+    assert not np.array_equal(new.buffers['u1'], old.buffers['u1'])
+    assert_same_cycles(new, build(days, tmp_path / "fresh").cycles())
+
+
+def test_touched_day_is_not_rebuilt(days, tmp_path):
+    store = build(days, tmp_path / "store")
+    chunk = store.chunk(0)
+    st = os.stat(days['trk_1'])
+    os.utime(days['trk_1'], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    store.verify()
+    assert store.chunk(0) is chunk
+    assert store.index["chunks"][0]["sources"]['trk_1']["mtime_ns"] == st.st_mtime_ns + 10**9